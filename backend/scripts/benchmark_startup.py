@@ -0,0 +1,88 @@
+"""
+Measure API worker startup cost
+
+Reports the cumulative import time of src.main (from `python -X importtime`)
+and the time from launching uvicorn until /health first answers.
+
+Usage (from backend/):
+    python scripts/benchmark_startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(top: int):
+    """Return (total_us, [(cumulative_us, module)]) for importing src.main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the separator
+        modules.append((int(cumulative), name[1:].rstrip()))
+
+    # Top-level imports are the ones without indentation
+    total = sum(us for us, name in modules if not name.startswith(" "))
+    heaviest = sorted(((us, name.strip()) for us, name in modules), reverse=True)[:top]
+    return total, heaviest
+
+
+def time_to_first_request(timeout: float = 60.0) -> float:
+    """Seconds from launching uvicorn until /health returns 200"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("API did not answer /health in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API worker startup cost")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        total, heaviest = import_times(args.top)
+        totals.append(total)
+
+    print(f"Import time of src.main: median {statistics.median(totals) / 1000:.1f} ms over {args.runs} runs")
+    for us, name in heaviest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    startups = [time_to_first_request() for _ in range(args.runs)]
+    print(f"Time to first request: median {statistics.median(startups) * 1000:.0f} ms "
+          f"(DB_INDEX_MODE={os.environ.get('DB_INDEX_MODE', 'startup')})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare per-document CPU of validated vs trusted reads
+
+Reads up to --limit patients and appointments from the configured database
+once, then times, per document:
+  validated - Model.model_validate + FastAPI's response_model pass + JSON
+  trusted   - TrustedJSONResponse encoding of the raw document
+
+Usage (from backend/, with MongoDB running):
+    python scripts/benchmark_trusted_reads.py [--limit 2000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from src.db.mongodb import init_db, close_db  # noqa: E402
+from src.db.trusted import TrustedJSONResponse  # noqa: E402
+from src.models.appointment import Appointment  # noqa: E402
+from src.models.patient import Patient  # noqa: E402
+
+
+def validated(model, adapter: TypeAdapter, docs: list) -> bytes:
+    """What a response_model endpoint returning Beanie documents does"""
+    models = [model.model_validate(doc) for doc in docs]
+    dumped = [m.model_dump(by_alias=True) for m in models]
+    return adapter.dump_json(adapter.validate_python(dumped), by_alias=True)
+
+
+def trusted(docs: list) -> bytes:
+    return TrustedJSONResponse(docs).body
+
+
+def per_document_us(func, docs: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        func(docs)
+        best = min(best, time.process_time() - started)
+    return best / len(docs) * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare validated vs trusted read cost")
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    await init_db()
+    try:
+        for model in (Patient, Appointment):
+            docs: List[dict] = await model.get_motor_collection().find().limit(args.limit).to_list(length=args.limit)
+            if not docs:
+                print(f"{model.__name__}: no documents to measure")
+                continue
+
+            adapter = TypeAdapter(List[model])
+            before = per_document_us(lambda d: validated(model, adapter, d), docs, args.repeat)
+            after = per_document_us(trusted, docs, args.repeat)
+            print(
+                f"{model.__name__:12} {len(docs):6d} docs  "
+                f"validated {before:8.1f} us/doc  trusted {after:8.1f} us/doc  ({before / after:.1f}x)"
+            )
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -15,6 +15,7 @@ db.patients.createIndex({ "status": 1 });
 db.patients.createIndex({ "tags": 1 });
 db.patients.createIndex({ "address.neighborhood": 1 });
 db.patients.createIndex({ "address.coordinates": "2dsphere" });
+db.patients.createIndex({ "address.zone": 1 });
 db.patients.createIndex({ "analytics.risk_score": 1 });
 db.patients.createIndex({ "created_at": 1 });
 
@@ -27,10 +28,23 @@ db.appointments.createIndex({ "car_id": 1 });
 db.appointments.createIndex({ "scheduled_date": 1 });
 db.appointments.createIndex({ "status": 1 });
 db.appointments.createIndex({ "scheduled_date": 1, "car_id": 1 });
+db.appointments.createIndex({ "scheduled_date": 1, "_id": 1 });
 db.appointments.createIndex({ "confirmation.status": 1 });
+db.appointments.createIndex({ "import_key": 1 });
+db.appointments.createIndex({ "confirmation.status": 1, "scheduled_date": 1 });
 
 print('Appointments collection created with indexes');
 
+// Create appointments archive collection with indexes
+db.createCollection('appointments_archive');
+db.appointments_archive.createIndex({ "patient_id": 1 });
+db.appointments_archive.createIndex({ "car_id": 1 });
+db.appointments_archive.createIndex({ "scheduled_date": 1 });
+db.appointments_archive.createIndex({ "scheduled_date": 1, "car_id": 1 });
+db.appointments_archive.createIndex({ "scheduled_date": 1, "_id": 1 });
+
+print('Appointments archive collection created with indexes');
+
 // Create cars collection with indexes
 db.createCollection('cars');
 db.cars.createIndex({ "name": 1 }, { unique: true });
@@ -40,6 +54,31 @@ db.cars.createIndex({ "driver.name": 1 });
 
 print('Cars collection created with indexes');
 
+// Create schedule imports collection with indexes
+db.createCollection('schedule_imports');
+db.schedule_imports.createIndex({ "file_hash": 1 }, { unique: true });
+db.schedule_imports.createIndex({ "dates": 1, "created_at": -1 });
+
+print('Schedule imports collection created with indexes');
+
+// Create zones and geocode cache collections with indexes
+db.createCollection('zones');
+db.zones.createIndex({ "name": 1 }, { unique: true });
+db.zones.createIndex({ "geometry": "2dsphere" });
+db.createCollection('geocode_cache');
+db.geocode_cache.createIndex({ "address_key": 1 }, { unique: true });
+
+print('Zones and geocode cache collections created with indexes');
+
+// Create outbound message queue collection with indexes
+db.createCollection('outbound_messages');
+db.outbound_messages.createIndex({ "dedupe_key": 1 }, { unique: true });
+db.outbound_messages.createIndex({ "campaign": 1 });
+db.outbound_messages.createIndex({ "external_id": 1 });
+db.outbound_messages.createIndex({ "status": 1, "next_attempt_at": 1 });
+
+print('Outbound messages collection created with indexes');
+
 // Insert sample data for development
 print('Inserting sample data...');
 
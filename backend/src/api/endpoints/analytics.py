@@ -6,13 +6,19 @@ from datetime import datetime, date, timedelta
 from typing import Optional
 
 from src.models.patient import Patient
-from src.models.appointment import Appointment
-from src.models.car import Car
+from src.models.appointment import Appointment, time_slot_minutes_expression
+from src.services.archive import with_archive
+from src.core.coalescing import coalesce
+from src.core.admission import ensure_date_range
+from src.core.columnar import mapping_to_columnar, to_columnar
+from src.services.car_registry import car_registry
+from src.services.risk_scoring import scoring_in_progress, start_scoring
 
 router = APIRouter()
 
 
 @router.get("/dashboard")
+@coalesce("dashboard")
 async def get_dashboard_metrics():
     """
     Get main dashboard KPIs
@@ -25,21 +31,28 @@ async def get_dashboard_metrics():
         "scheduled_date": {"$gte": today, "$lt": tomorrow}
     })
     
-    # Confirmation rate (last 30 days)
+    # Confirmation rate and completed durations (last 30 days)
     last_30_days = today - timedelta(days=30)
-    recent_appointments = await Appointment.find({
-        "scheduled_date": {"$gte": last_30_days}
-    }).to_list()
+    recent = await Appointment.aggregate(
+        with_archive({"scheduled_date": {"$gte": last_30_days}}, last_30_days) + [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "confirmed": {"$sum": {"$cond": [{"$eq": ["$confirmation.status", "confirmed"]}, 1, 0]}},
+                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}},
+                "completed_duration": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, "$duration", 0]}}
+            }}
+        ]
+    ).to_list()
+    recent = recent[0] if recent else {"total": 0, "confirmed": 0, "completed": 0, "completed_duration": 0}
     
-    confirmed = sum(1 for apt in recent_appointments if apt.confirmation.status == "confirmed")
-    confirmation_rate = confirmed / len(recent_appointments) if recent_appointments else 0
+    confirmation_rate = recent["confirmed"] / recent["total"] if recent["total"] else 0
     
     # Active cars
-    active_cars = await Car.count_documents({"active": True})
+    active_cars = len(await car_registry.active())
     
     # Average collection time
-    completed_appointments = [apt for apt in recent_appointments if apt.status == "completed"]
-    avg_time = sum(apt.duration for apt in completed_appointments) / len(completed_appointments) if completed_appointments else 0
+    avg_time = recent["completed_duration"] / recent["completed"] if recent["completed"] else 0
     
     return {
         "visits_today": today_appointments,
@@ -50,9 +63,11 @@ async def get_dashboard_metrics():
 
 
 @router.get("/patients")
+@coalesce("patient_analytics")
 async def get_patient_analytics(
     date_from: Optional[date] = Query(None),
-    date_to: Optional[date] = Query(None)
+    date_to: Optional[date] = Query(None),
+    format: str = Query("json", pattern="^(json|columnar)$")
 ):
     """
     Get patient analytics
@@ -86,7 +101,7 @@ async def get_patient_analytics(
         {"$limit": 10}
     ]).to_list()
     
-    return {
+    result = {
         "total_patients": total_patients,
         "new_patients_this_month": new_patients,
         "risk_distribution": {item["_id"]: item["count"] for item in risk_distribution},
@@ -95,63 +110,102 @@ async def get_patient_analytics(
             for item in neighborhoods if item["_id"]
         ]
     }
+    
+    if format == "columnar":
+        result.update({
+            "format": "columnar",
+            "risk_distribution": mapping_to_columnar(result["risk_distribution"], "risk_score"),
+            "top_neighborhoods": to_columnar(result["top_neighborhoods"])
+        })
+    return result
 
 
 @router.get("/schedule")
+@coalesce("schedule_analytics")
 async def get_schedule_analytics(
     date_from: date = Query(...),
-    date_to: date = Query(...)
+    date_to: date = Query(...),
+    format: str = Query("json", pattern="^(json|columnar)$")
 ):
     """
     Get schedule analytics for date range
     """
+    ensure_date_range(date_from, date_to)
     start = datetime.combine(date_from, datetime.min.time())
     end = datetime.combine(date_to, datetime.max.time())
     
-    appointments = await Appointment.find({
-        "scheduled_date": {"$gte": start, "$lte": end}
-    }).to_list()
+    # Count by status, car and hour in a single aggregation
+    match = {"scheduled_date": {"$gte": start, "$lte": end}}
+    [facets] = await Appointment.aggregate(with_archive(match, start) + [
+        {"$facet": {
+            "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "cars": [{"$group": {"_id": "$car_id", "count": {"$sum": 1}}}],
+            "hours": [
+                {"$group": {
+                    # Documents not yet backfilled fall back to the time slot string
+                    "_id": {"$ifNull": [
+                        {"$hour": "$start_at"},
+                        {"$floor": {"$divide": [time_slot_minutes_expression("$time_slot"), 60]}}
+                    ]},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+        }}
+    ]).to_list()
     
     # Status distribution
-    status_dist = {}
-    for apt in appointments:
-        status_dist[apt.status] = status_dist.get(apt.status, 0) + 1
+    status_dist = {item["_id"]: item["count"] for item in facets["status"]}
+    total_appointments = sum(status_dist.values())
     
     # Car utilization
-    cars = await Car.find({"active": True}).to_list()
+    cars = await car_registry.active()
+    car_counts = {item["_id"]: item["count"] for item in facets["cars"]}
     car_utilization = {}
     
     for car in cars:
-        car_appointments = [apt for apt in appointments if apt.car_id == str(car.id)]
+        car_appointments = car_counts.get(str(car.id), 0)
         days_in_range = (date_to - date_from).days + 1
-        utilization = len(car_appointments) / (car.capacity * days_in_range) if days_in_range > 0 else 0
+        utilization = car_appointments / (car.capacity * days_in_range) if days_in_range > 0 else 0
         
         car_utilization[car.name] = {
-            "appointments": len(car_appointments),
+            "appointments": car_appointments,
             "capacity": car.capacity * days_in_range,
             "utilization_rate": round(utilization * 100, 1)
         }
     
     # Time slot distribution
-    time_slots = {}
-    for apt in appointments:
-        hour = apt.time_slot.split(":")[0]
-        time_slots[f"{hour}:00"] = time_slots.get(f"{hour}:00", 0) + 1
+    time_slots = {
+        f"{int(item['_id']):02d}:00": item["count"]
+        for item in facets["hours"] if item["_id"] is not None
+    }
     
-    return {
+    result = {
         "date_range": {
             "from": date_from.isoformat(),
             "to": date_to.isoformat()
         },
-        "total_appointments": len(appointments),
+        "total_appointments": total_appointments,
         "status_distribution": status_dist,
         "car_utilization": car_utilization,
         "time_slot_distribution": dict(sorted(time_slots.items()))
     }
+    
+    if format == "columnar":
+        result.update({
+            "format": "columnar",
+            "status_distribution": mapping_to_columnar(status_dist, "status"),
+            "car_utilization": mapping_to_columnar(car_utilization, "car"),
+            "time_slot_distribution": mapping_to_columnar(result["time_slot_distribution"], "time_slot")
+        })
+    return result
 
 
 @router.get("/confirmations")
-async def get_confirmation_analytics():
+@coalesce("confirmation_analytics")
+async def get_confirmation_analytics(
+    format: str = Query("json", pattern="^(json|columnar)$")
+):
     """
     Get confirmation analytics
     """
@@ -159,11 +213,11 @@ async def get_confirmation_analytics():
     last_30_days = datetime.utcnow() - timedelta(days=30)
     
     # Confirmation by method
-    confirmations = await Appointment.aggregate([
-        {"$match": {
-            "scheduled_date": {"$gte": last_30_days},
-            "confirmation.status": "confirmed"
-        }},
+    confirmed_match = {
+        "scheduled_date": {"$gte": last_30_days},
+        "confirmation.status": "confirmed"
+    }
+    confirmations = await Appointment.aggregate(with_archive(confirmed_match, last_30_days) + [
         {"$group": {
             "_id": "$confirmation.method",
             "count": {"$sum": 1}
@@ -171,11 +225,7 @@ async def get_confirmation_analytics():
     ]).to_list()
     
     # Confirmation by time of day
-    time_distribution = await Appointment.aggregate([
-        {"$match": {
-            "scheduled_date": {"$gte": last_30_days},
-            "confirmation.status": "confirmed"
-        }},
+    time_distribution = await Appointment.aggregate(with_archive(confirmed_match, last_30_days) + [
         {"$group": {
             "_id": {"$hour": "$confirmation.confirmed_at"},
             "count": {"$sum": 1}
@@ -183,11 +233,30 @@ async def get_confirmation_analytics():
         {"$sort": {"_id": 1}}
     ]).to_list()
     
-    return {
+    result = {
         "confirmation_by_method": {
             item["_id"]: item["count"] for item in confirmations if item["_id"]
         },
         "confirmation_by_hour": {
             f"{item['_id']:02d}:00": item["count"] for item in time_distribution
         }
-    }
\ No newline at end of file
+    }
+    
+    if format == "columnar":
+        result.update({
+            "format": "columnar",
+            "confirmation_by_method": mapping_to_columnar(result["confirmation_by_method"], "method"),
+            "confirmation_by_hour": mapping_to_columnar(result["confirmation_by_hour"], "hour")
+        })
+    return result
+
+
+@router.post("/risk-scores", status_code=202)
+async def recompute_risk_scores():
+    """
+    Start a no-show risk scoring pass over all patients in the background
+    """
+    if await scoring_in_progress():
+        return {"status": "running"}
+    start_scoring()
+    return {"status": "started"}
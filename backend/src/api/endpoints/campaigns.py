@@ -0,0 +1,70 @@
+"""
+Confirmation campaign API endpoints
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Body, HTTPException, Query
+from datetime import date, timedelta
+
+from src.models.outbound_message import OutboundMessage
+from src.services.campaigns import apply_responses, campaign_key, dispatch_pending, enqueue_confirmations
+
+router = APIRouter()
+
+
+@router.post("/confirmations")
+async def enqueue_confirmation_campaign(
+    day: Optional[date] = Query(None, description="Appointment day (defaults to tomorrow)")
+):
+    """
+    Queue confirmation messages for a day's pending appointments
+    """
+    return await enqueue_confirmations(day or date.today() + timedelta(days=1))
+
+
+@router.post("/dispatch")
+async def dispatch_messages():
+    """
+    Send every message that is ready now
+    """
+    return await dispatch_pending()
+
+
+@router.post("/responses")
+async def receive_responses(responses: List[dict] = Body(...)):
+    """
+    Apply patient replies ({"external_id" or "message_id", "reply"}) in bulk
+    """
+    if any(not r.get("reply") or not (r.get("external_id") or r.get("message_id")) for r in responses):
+        raise HTTPException(status_code=400, detail="Each response needs a reply and an external_id or message_id")
+    return await apply_responses(responses)
+
+
+@router.get("/messages", response_model=List[OutboundMessage])
+async def list_messages(
+    day: Optional[date] = Query(None, description="Campaign appointment day"),
+    status: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    List queued and sent messages
+    """
+    query_filter = {}
+    if day:
+        query_filter["campaign"] = campaign_key(day)
+    if status:
+        query_filter["status"] = status
+    return await OutboundMessage.find(query_filter).sort("-created_at").skip(skip).limit(limit).to_list()
+
+
+@router.get("/summary")
+async def campaign_summary(day: Optional[date] = Query(None, description="Defaults to tomorrow")):
+    """
+    Message counts by status for one campaign
+    """
+    campaign = campaign_key(day or date.today() + timedelta(days=1))
+    counts = await OutboundMessage.aggregate([
+        {"$match": {"campaign": campaign}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list()
+    return {"campaign": campaign, "status": {item["_id"]: item["count"] for item in counts}}
@@ -0,0 +1,224 @@
+"""
+Geo API endpoints
+"""
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from beanie import PydanticObjectId
+from datetime import datetime, date
+from pymongo import UpdateOne
+
+from src.models.zone import Zone
+from src.models.patient import Patient
+from src.models.appointment import Appointment
+from src.services.car_registry import car_registry
+from src.services.geo import get_zone_index, invalidate_zone_index, km_to_radians, address_key, geocode_many
+
+router = APIRouter()
+
+# Patients updated per bulk_write when assigning zones
+ASSIGN_BATCH_SIZE = 1000
+
+
+@router.get("/zones", response_model=List[Zone])
+async def list_zones(active: Optional[bool] = Query(None)):
+    """
+    List service zones
+    """
+    query_filter = {} if active is None else {"active": active}
+    return await Zone.find(query_filter).to_list()
+
+
+@router.post("/zones", response_model=Zone)
+async def create_zone(zone_data: Zone):
+    """
+    Create a service zone
+    """
+    existing = await Zone.find_one({"name": zone_data.name})
+    if existing:
+        raise HTTPException(status_code=400, detail="Zone with this name already exists")
+
+    zone = await zone_data.create()
+    invalidate_zone_index()
+    return zone
+
+
+@router.post("/zones/assign")
+async def assign_zones(geocode: bool = Query(False, description="Geocode patients without coordinates first")):
+    """
+    Recompute the zone of every active patient
+    """
+    zone_index = await get_zone_index()
+    collection = Patient.get_motor_collection()
+    cursor = collection.find(
+        {"status": "active"},
+        projection={"address": 1}
+    ).batch_size(ASSIGN_BATCH_SIZE)
+
+    assigned = 0
+    geocoded = 0
+    while patients := await cursor.to_list(length=ASSIGN_BATCH_SIZE):
+        coordinates = {}
+        if geocode:
+            missing = [p["address"] for p in patients if not p["address"].get("coordinates")]
+            if missing:
+                coordinates = await geocode_many(missing)
+
+        writes = []
+        for patient in patients:
+            address = patient["address"]
+            fields = {}
+            point = address.get("coordinates")
+            if not point and coordinates.get(address_key(address)):
+                point = coordinates[address_key(address)]
+                fields["address.coordinates"] = point
+                geocoded += 1
+            zone = zone_index.locate(point)
+            if zone != address.get("zone"):
+                fields["address.zone"] = zone
+            if fields:
+                writes.append(UpdateOne({"_id": patient["_id"]}, {"$set": fields}))
+                assigned += "address.zone" in fields
+
+        if writes:
+            await collection.bulk_write(writes, ordered=False)
+
+    return {"assigned": assigned, "geocoded": geocoded}
+
+
+@router.get("/patients/near-route")
+async def patients_near_route(
+    car_id: str = Query(...),
+    date: date = Query(..., description="Day of the car route"),
+    radius_km: float = Query(2.0, gt=0, le=50),
+    limit: int = Query(100, ge=1, le=500)
+):
+    """
+    Active patients within radius_km of any stop on a car's route
+    """
+    stops = await _route_stops(car_id, date)
+    if not stops:
+        return {"car_id": car_id, "date": date.isoformat(), "stops": 0, "patients": []}
+
+    radius = km_to_radians(radius_km)
+    patients = await Patient.get_motor_collection().find(
+        {
+            "status": "active",
+            "_id": {"$nin": [stop["_id"] for stop in stops]},
+            "$or": [
+                {"address.coordinates": {"$geoWithin": {"$centerSphere": [stop["address"]["coordinates"], radius]}}}
+                for stop in stops
+            ]
+        },
+        projection={"personal_info.name": 1, "address": 1, "analytics.risk_score": 1}
+    ).limit(limit).to_list(length=limit)
+
+    return {
+        "car_id": car_id,
+        "date": date.isoformat(),
+        "stops": len(stops),
+        "patients": [
+            {
+                "patient_id": str(patient["_id"]),
+                "name": patient["personal_info"]["name"],
+                "neighborhood": patient["address"].get("neighborhood"),
+                "zone": patient["address"].get("zone"),
+                "coordinates": patient["address"].get("coordinates")
+            }
+            for patient in patients
+        ]
+    }
+
+
+@router.get("/cars/nearest")
+async def nearest_available_car(
+    patient_id: PydanticObjectId = Query(...),
+    date: date = Query(...),
+    max_km: float = Query(10.0, gt=0, le=100)
+):
+    """
+    Nearest car with spare capacity on a date, measured to its closest stop
+
+    Cars with no stops yet are ranked by whether they serve the patient's zone.
+    """
+    patient = await Patient.get(patient_id)
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    if not patient.address.coordinates:
+        raise HTTPException(status_code=400, detail="Patient has no coordinates")
+
+    day = datetime.combine(date, datetime.min.time())
+    cars = {
+        str(car.id): car for car in await car_registry.active()
+        if day not in car.unavailable_dates
+    }
+
+    # Load per car occupancy for the day
+    load = {car_id: 0 for car_id in cars}
+    stops_by_patient = {}
+    async for apt in Appointment.get_motor_collection().find(
+        {"scheduled_date": day, "status": {"$nin": ["cancelled", "no_show"]}},
+        projection={"car_id": 1, "patient_id": 1}
+    ):
+        if apt["car_id"] in load:
+            load[apt["car_id"]] += 1
+            stops_by_patient.setdefault(apt["patient_id"], set()).add(apt["car_id"])
+    available = {car_id for car_id, car in cars.items() if load[car_id] < car.capacity}
+
+    # Closest stops first, across every route of the day
+    stop_ids = [PydanticObjectId(pid) for pid in stops_by_patient if PydanticObjectId.is_valid(pid)]
+    nearest = await Patient.aggregate([
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": patient.address.coordinates},
+            "key": "address.coordinates",
+            "distanceField": "distance",
+            "maxDistance": max_km * 1000,
+            "spherical": True,
+            "query": {"_id": {"$in": stop_ids}}
+        }},
+        {"$project": {"distance": 1}}
+    ]).to_list()
+
+    candidates = []
+    seen = set()
+    for stop in nearest:
+        for car_id in stops_by_patient.get(str(stop["_id"]), ()):
+            if car_id in available and car_id not in seen:
+                seen.add(car_id)
+                candidates.append((car_id, round(stop["distance"] / 1000, 2)))
+
+    # Idle cars serving the patient's zone come after the measured ones
+    zone = patient.address.zone or patient.address.neighborhood
+    for car_id in available - seen:
+        if zone in cars[car_id].zones:
+            candidates.append((car_id, None))
+
+    return {
+        "patient_id": str(patient_id),
+        "date": date.isoformat(),
+        "zone": patient.address.zone,
+        "cars": [
+            {
+                "car_id": car_id,
+                "name": cars[car_id].name,
+                "distance_km": distance,
+                "appointments": load[car_id],
+                "capacity": cars[car_id].capacity
+            }
+            for car_id, distance in candidates
+        ]
+    }
+
+
+async def _route_stops(car_id: str, day: date) -> list:
+    """Patients with coordinates visited by a car on a day"""
+    start = datetime.combine(day, datetime.min.time())
+    appointments = await Appointment.get_motor_collection().find(
+        {"car_id": car_id, "scheduled_date": start, "status": {"$nin": ["cancelled", "no_show"]}},
+        projection={"patient_id": 1, "time_slot": 1}
+    ).to_list(length=None)
+
+    ids = [PydanticObjectId(apt["patient_id"]) for apt in appointments if PydanticObjectId.is_valid(apt["patient_id"])]
+    return await Patient.get_motor_collection().find(
+        {"_id": {"$in": ids}, "address.coordinates": {"$ne": None}},
+        projection={"address.coordinates": 1}
+    ).to_list(length=None)
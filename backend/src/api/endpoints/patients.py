@@ -3,13 +3,24 @@ Patients API endpoints
 """
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
 from beanie import PydanticObjectId
+from pydantic import ValidationError
+from pymongo import ReturnDocument
 from datetime import datetime
 
-from src.models.patient import Patient, PersonalInfo, Contact, Address
+from src.core.config import settings
+from src.db.trusted import TrustedJSONResponse, with_defaults
+from src.db.versioning import find_one_and_update
+from src.models.patient import Patient, PersonalInfo, Contact, Address, ConfirmationAttempt
+from src.services.file_processor import PATIENT_COLUMNS, EXPORT_FORMATS, patient_row, stream_export
+from src.services.geo import get_zone_index
 
 router = APIRouter()
 
+# Documents read from MongoDB per export batch
+EXPORT_BATCH_SIZE = 500
+
 
 @router.get("/", response_model=List[Patient])
 async def list_patients(
@@ -23,30 +34,14 @@ async def list_patients(
     """
     List patients with pagination and filters
     """
-    # Build query
-    query_filter = {}
-    
-    if status:
-        query_filter["status"] = status
-    
-    if neighborhood:
-        query_filter["address.neighborhood"] = {"$regex": neighborhood, "$options": "i"}
-    
-    if risk_score:
-        query_filter["analytics.risk_score"] = risk_score
-    
-    # Search across multiple fields
-    if search:
-        query_filter["$or"] = [
-            {"personal_info.name": {"$regex": search, "$options": "i"}},
-            {"personal_info.cpf": search.replace(".", "").replace("-", "")},
-            {"contacts.value": {"$regex": search.replace(" ", "").replace("-", ""), "$options": "i"}}
-        ]
+    query_filter = _build_filter(search, status, neighborhood, risk_score)
     
     # Execute query
-    patients = await Patient.find(query_filter).skip(skip).limit(limit).to_list()
+    patients = await Patient.get_motor_collection().find(query_filter).skip(skip).limit(limit).to_list(length=limit)
     
-    return patients
+    if settings.TRUSTED_READS:
+        return TrustedJSONResponse([with_defaults(Patient, doc) for doc in patients])
+    return [Patient.model_validate(doc) for doc in patients]
 
 
 @router.post("/", response_model=Patient)
@@ -59,11 +54,46 @@ async def create_patient(patient_data: Patient):
     if existing:
         raise HTTPException(status_code=400, detail="Patient with this CPF already exists")
     
+    # Assign service zone from coordinates
+    if patient_data.address.coordinates and not patient_data.address.zone:
+        zone_index = await get_zone_index()
+        patient_data.address.zone = zone_index.locate(patient_data.address.coordinates)
+    
     # Create patient
     patient = await patient_data.create()
     return patient
 
 
+@router.get("/export")
+async def export_patients(
+    search: Optional[str] = Query(None, description="Search by name, CPF, or phone"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    neighborhood: Optional[str] = Query(None, description="Filter by neighborhood"),
+    risk_score: Optional[str] = Query(None, description="Filter by risk score"),
+    format: str = Query("csv", pattern="^(csv|xlsx|parquet)$")
+):
+    """
+    Export patients using the DasaExp patient columns
+    """
+    query_filter = _build_filter(search, status, neighborhood, risk_score)
+    
+    async def batches():
+        cursor = Patient.get_motor_collection().find(
+            query_filter,
+            projection={"personal_info": 1, "address": 1, "contacts": 1}
+        ).sort("personal_info.name", 1).batch_size(EXPORT_BATCH_SIZE)
+        
+        while patients := await cursor.to_list(length=EXPORT_BATCH_SIZE):
+            yield [patient_row(patient) for patient in patients]
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(batches(), PATIENT_COLUMNS, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="pacientes.{extension}"'}
+    )
+
+
 @router.get("/{patient_id}", response_model=Patient)
 async def get_patient(patient_id: PydanticObjectId):
     """
@@ -77,36 +107,38 @@ async def get_patient(patient_id: PydanticObjectId):
 
 
 @router.put("/{patient_id}", response_model=Patient)
-async def update_patient(patient_id: PydanticObjectId, patient_data: dict = Body(...)):
+async def update_patient(
+    patient_id: PydanticObjectId,
+    patient_data: dict = Body(...),
+    expected_version: Optional[int] = Query(None, description="Reject the update if the stored version differs")
+):
     """
     Update patient information
     """
-    patient = await Patient.get(patient_id)
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
+    # Fields managed by the server are never taken from the request body
+    for field in ("_id", "id", "version", "created_at"):
+        patient_data.pop(field, None)
     
-    # Update fields
+    # Update fields and return the post-image in a single round-trip
     patient_data["updated_at"] = datetime.utcnow()
-    await patient.update({"$set": patient_data})
+    patient = await find_one_and_update(Patient, patient_id, patient_data, expected_version)
     
-    # Refresh from database
-    await patient.sync()
     return patient
 
 
 @router.delete("/{patient_id}")
-async def delete_patient(patient_id: PydanticObjectId):
+async def delete_patient(
+    patient_id: PydanticObjectId,
+    expected_version: Optional[int] = Query(None, description="Reject the update if the stored version differs")
+):
     """
     Delete patient (soft delete by changing status)
     """
-    patient = await Patient.get(patient_id)
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-    
     # Soft delete
-    patient.status = "inactive"
-    patient.updated_at = datetime.utcnow()
-    await patient.save()
+    await find_one_and_update(Patient, patient_id, {
+        "status": "inactive",
+        "updated_at": datetime.utcnow()
+    }, expected_version)
     
     return {"message": "Patient deactivated successfully"}
 
@@ -136,19 +168,70 @@ async def add_confirmation_attempt(
     """
     Add confirmation attempt for patient
     """
-    patient = await Patient.get(patient_id)
+    now = datetime.utcnow()
+    try:
+        attempt = ConfirmationAttempt(**{**attempt_data, "date": now})
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid confirmation attempt: {e}")
+    
+    # Append the attempt, recompute the rate and bump the version in one
+    # pipeline update, so concurrent writes to other fields are preserved
+    patient = await Patient.get_motor_collection().find_one_and_update(
+        {"_id": patient_id},
+        [
+            {"$set": {
+                "confirmation_attempts": {"$concatArrays": [
+                    {"$ifNull": ["$confirmation_attempts", []]},
+                    [{"$literal": attempt.model_dump()}]
+                ]},
+                "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                "updated_at": now
+            }},
+            {"$set": {"confirmation_rate": {"$divide": [
+                {"$size": {"$filter": {
+                    "input": "$confirmation_attempts",
+                    "cond": {"$eq": ["$$this.status", "confirmed"]}
+                }}},
+                {"$size": "$confirmation_attempts"}
+            ]}}}
+        ],
+        projection={"confirmation_rate": 1, "version": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    # Add confirmation attempt
-    attempt_data["date"] = datetime.utcnow()
-    patient.confirmation_attempts.append(attempt_data)
+    return {
+        "message": "Confirmation attempt added",
+        "confirmation_rate": patient["confirmation_rate"],
+        "version": patient["version"]
+    }
+
+
+def _build_filter(
+    search: Optional[str],
+    status: Optional[str],
+    neighborhood: Optional[str],
+    risk_score: Optional[str]
+) -> dict:
+    """Build the patient query shared by listing and export"""
+    query_filter = {}
     
-    # Update confirmation rate
-    confirmed = sum(1 for a in patient.confirmation_attempts if a.get("status") == "confirmed")
-    patient.confirmation_rate = confirmed / len(patient.confirmation_attempts) if patient.confirmation_attempts else 0
+    if status:
+        query_filter["status"] = status
+    
+    if neighborhood:
+        query_filter["address.neighborhood"] = {"$regex": neighborhood, "$options": "i"}
+    
+    if risk_score:
+        query_filter["analytics.risk_score"] = risk_score
     
-    patient.updated_at = datetime.utcnow()
-    await patient.save()
+    # Search across multiple fields
+    if search:
+        query_filter["$or"] = [
+            {"personal_info.name": {"$regex": search, "$options": "i"}},
+            {"personal_info.cpf": search.replace(".", "").replace("-", "")},
+            {"contacts.value": {"$regex": search.replace(" ", "").replace("-", ""), "$options": "i"}}
+        ]
     
-    return {"message": "Confirmation attempt added", "confirmation_rate": patient.confirmation_rate}
\ No newline at end of file
+    return query_filter
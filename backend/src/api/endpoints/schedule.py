@@ -1,19 +1,106 @@
 """
 Schedule API endpoints
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Query, Body, UploadFile, File
+from fastapi.responses import StreamingResponse
 from beanie import PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
 from datetime import datetime, date
-import pandas as pd
-import io
 
-from src.models.appointment import Appointment
+from src.core.config import settings
+from src.db.trusted import TrustedJSONResponse, with_defaults
+from src.db.versioning import find_one_and_update, version_filter
+from src.models.appointment import Appointment, schedule_fields, overlap_filter, parse_time_slot, normalize_time_slot
 from src.models.patient import Patient
-from src.models.car import Car
+from src.services.file_processor import DASAEXP_COLUMNS, EXPORT_FORMATS, appointment_row, stream_export
+from src.services.schedule_importer import import_schedule
+from src.services.archive import includes_archive, reaches_archive, with_archive
+from src.core.admission import ensure_date_range
+from src.core.coalescing import coalesce
+from src.core.columnar import to_columnar
+from src.services.car_registry import car_registry
 
 router = APIRouter()
 
+# Statuses that free up a car's time slot
+INACTIVE_STATUSES = ["cancelled", "no_show"]
+
+# Documents read from MongoDB per export batch
+EXPORT_BATCH_SIZE = 500
+
+
+class BulkOperation(BaseModel):
+    """Single item of a bulk appointment operation"""
+    appointment_id: PydanticObjectId
+    action: str = Field(..., pattern="^(confirm|reschedule|cancel|reassign_car)$")
+    scheduled_date: Optional[date] = None
+    time_slot: Optional[str] = Field(None, pattern="^([01][0-9]|2[0-3]):[0-5][0-9]$")
+    car_id: Optional[str] = None
+    confirmed_by: Optional[str] = None
+    method: Optional[str] = None
+    notes: Optional[str] = None
+    expected_version: Optional[int] = None
+
+
+class BulkRequest(BaseModel):
+    """Batch of appointment operations applied together"""
+    operations: List[BulkOperation] = Field(..., min_length=1, max_length=1000)
+
+
+def _is_time_slot(time_slot) -> bool:
+    """Whether a stored time slot can be placed on the schedule"""
+    try:
+        parse_time_slot(time_slot)
+        return True
+    except ValueError:
+        return False
+
+
+def _trusted_appointment(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Raw appointment with the defaults and derived times validation would add"""
+    with_defaults(Appointment, doc)
+    if doc["start_at"] is None:
+        try:
+            doc.update(schedule_fields(doc["scheduled_date"], doc["time_slot"], doc["duration"]))
+        except (KeyError, ValueError):
+            pass  # Left empty, as Appointment.fill_schedule_fields does
+    return doc
+
+
+def _valid_scheduled_date(value) -> datetime:
+    """Scheduled date from a request body as the stored midnight datetime, 400 when unparseable"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid scheduled_date {value!r}, expected YYYY-MM-DD")
+    if not isinstance(value, date):
+        raise HTTPException(status_code=400, detail="Invalid scheduled_date, expected YYYY-MM-DD")
+    return _midnight(value.date() if isinstance(value, datetime) else value)
+
+
+def _valid_duration(value) -> int:
+    """Duration in minutes from a request body, 400 outside the model's 15-120 range"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HTTPException(status_code=400, detail="Invalid duration, expected minutes")
+    try:
+        duration = int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid duration {value!r}, expected minutes")
+    if not 15 <= duration <= 120:
+        raise HTTPException(status_code=400, detail="Duration must be between 15 and 120 minutes")
+    return duration
+
+
+def _valid_time_slot(time_slot) -> str:
+    """Normalized time slot, 400 when it is not HH:MM"""
+    try:
+        return normalize_time_slot(time_slot)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.get("/", response_model=List[Appointment])
 async def list_appointments(
@@ -26,35 +113,105 @@ async def list_appointments(
 ):
     """
     List appointments with filters
+    
+    Without date bounds only the hot collection is listed; archived
+    appointments are returned when date_from or date_to reaches past the
+    archive boundary. Both tiers page in (scheduled_date, _id) order.
     """
-    query_filter = {}
+    ensure_date_range(date_from, date_to)
+    query_filter = _build_filter(date_from, date_to, car_id, status)
+    start = query_filter.get("scheduled_date", {}).get("$gte")
+    end = query_filter.get("scheduled_date", {}).get("$lte")
     
-    # Date range filter
-    if date_from or date_to:
-        date_filter = {}
-        if date_from:
-            date_filter["$gte"] = datetime.combine(date_from, datetime.min.time())
-        if date_to:
-            date_filter["$lte"] = datetime.combine(date_to, datetime.max.time())
-        query_filter["scheduled_date"] = date_filter
+    if not reaches_archive(start, end):
+        cursor = Appointment.get_motor_collection().find(query_filter).sort(
+            [("scheduled_date", 1), ("_id", 1)]
+        ).skip(skip).limit(limit)
+    else:
+        # Range reaches the archive: page over both tiers in the same order
+        cursor = Appointment.get_motor_collection().aggregate(
+            with_archive(query_filter, start) + [
+                {"$sort": {"scheduled_date": 1, "_id": 1}},
+                {"$skip": skip},
+                {"$limit": limit}
+            ]
+        )
+    appointments = await cursor.to_list(length=limit)
     
-    if car_id:
-        query_filter["car_id"] = car_id
+    if settings.TRUSTED_READS:
+        return TrustedJSONResponse([_trusted_appointment(doc) for doc in appointments])
+    return [Appointment.model_validate(doc) for doc in appointments]
+
+
+@router.get("/export")
+async def export_appointments(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    car_id: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    format: str = Query("csv", pattern="^(csv|xlsx|parquet)$")
+):
+    """
+    Export appointments in the DasaExp spreadsheet layout
     
-    if status:
-        query_filter["status"] = status
+    The sheet has no appointment status column, so cancelled and no-show
+    appointments are left out unless `status` asks for them; uploading
+    the export again then leaves them as they are.
+    """
+    ensure_date_range(date_from, date_to)
+    query_filter = _build_filter(date_from, date_to, car_id, status)
+    if not status:
+        query_filter["status"] = {"$nin": INACTIVE_STATUSES}
+    await car_registry.active()  # Make sure the registry is fresh before streaming
     
-    appointments = await Appointment.find(query_filter).skip(skip).limit(limit).to_list()
-    return appointments
+    start = query_filter.get("scheduled_date", {}).get("$gte")
+    
+    async def batches():
+        collection = Appointment.get_motor_collection()
+        if includes_archive(start):
+            cursor = collection.aggregate(
+                with_archive(query_filter, start) + [{"$sort": {"scheduled_date": 1, "car_id": 1, "time_slot": 1}}],
+                allowDiskUse=True,
+                batchSize=EXPORT_BATCH_SIZE
+            )
+        else:
+            cursor = collection.find(query_filter).sort(
+                [("scheduled_date", 1), ("car_id", 1), ("time_slot", 1)]
+            ).batch_size(EXPORT_BATCH_SIZE)
+        
+        while appointments := await cursor.to_list(length=EXPORT_BATCH_SIZE):
+            # One patient lookup per batch
+            patient_ids = [
+                PydanticObjectId(apt["patient_id"]) for apt in appointments
+                if PydanticObjectId.is_valid(apt["patient_id"])
+            ]
+            patients = {
+                str(patient["_id"]): patient
+                async for patient in Patient.get_motor_collection().find(
+                    {"_id": {"$in": patient_ids}},
+                    projection={"personal_info": 1, "address": 1, "contacts": 1}
+                )
+            }
+            yield [
+                appointment_row(apt, patients.get(apt["patient_id"]), _car_name(apt["car_id"]))
+                for apt in appointments
+            ]
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(batches(), DASAEXP_COLUMNS, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="agenda.{extension}"'}
+    )
 
 
-@router.get("/calendar")
-async def get_calendar_view(
-    date: date = Query(..., description="Date to view schedule"),
-    car_ids: Optional[List[str]] = Query(None)
-):
+@coalesce("calendar")
+async def _calendar(date: date, car_ids: Optional[List[str]], format: str) -> Dict[str, Any]:
     """
-    Get calendar view for specific date
+    Calendar content for a date
+    
+    Identical concurrent requests share the returned data; each request
+    builds its own response from it.
     """
     # Get appointments for the date
     start = datetime.combine(date, datetime.min.time())
@@ -64,15 +221,19 @@ async def get_calendar_view(
     if car_ids:
         query_filter["car_id"] = {"$in": car_ids}
     
-    appointments = await Appointment.find(query_filter).to_list()
+    appointments = await Appointment.get_motor_collection().find(query_filter).to_list(length=None)
     
     # Get cars
-    cars = await Car.find({"active": True}).to_list()
+    cars = await car_registry.active()
     
     # Organize by car
+    by_car = {}
+    for apt in appointments:
+        by_car.setdefault(apt["car_id"], []).append(apt)
+    
     calendar = {}
     for car in cars:
-        car_appointments = [apt for apt in appointments if apt.car_id == str(car.id)]
+        car_appointments = by_car.get(str(car.id), [])
         calendar[car.name] = {
             "car_id": str(car.id),
             "driver": car.driver.name,
@@ -81,11 +242,43 @@ async def get_calendar_view(
             "capacity": car.capacity
         }
     
-    return {
+    content = {
         "date": date.isoformat(),
         "total_appointments": len(appointments),
         "cars": calendar
     }
+    
+    if format == "columnar":
+        for entry in calendar.values():
+            rows = entry["appointments"]
+            if settings.TRUSTED_READS:
+                rows = [_trusted_appointment(doc) for doc in rows]
+            else:
+                rows = [Appointment.model_validate(doc).model_dump(by_alias=True) for doc in rows]
+            entry["appointments"] = to_columnar(rows)
+        content["format"] = "columnar"
+    else:
+        for entry in calendar.values():
+            entry["appointments"] = [
+                _trusted_appointment(doc) if settings.TRUSTED_READS else Appointment.model_validate(doc)
+                for doc in entry["appointments"]
+            ]
+    return content
+
+
+@router.get("/calendar")
+async def get_calendar_view(
+    date: date = Query(..., description="Date to view schedule"),
+    car_ids: Optional[List[str]] = Query(None),
+    format: str = Query("json", pattern="^(json|columnar)$")
+):
+    """
+    Get calendar view for specific date
+    """
+    content = await _calendar(date=date, car_ids=car_ids, format=format)
+    if format == "columnar" or settings.TRUSTED_READS:
+        return TrustedJSONResponse(content)
+    return content
 
 
 @router.post("/", response_model=Appointment)
@@ -93,23 +286,26 @@ async def create_appointment(appointment_data: Appointment):
     """
     Create a new appointment
     """
+    appointment_data.time_slot = _valid_time_slot(appointment_data.time_slot)
+    appointment_data.fill_schedule_fields()
+    
     # Validate patient exists
     patient = await Patient.get(appointment_data.patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     # Validate car exists
-    car = await Car.get(appointment_data.car_id)
+    car = await car_registry.get(appointment_data.car_id)
     if not car:
         raise HTTPException(status_code=404, detail="Car not found")
     
     # Check for conflicts
-    existing = await Appointment.find_one({
-        "car_id": appointment_data.car_id,
-        "scheduled_date": appointment_data.scheduled_date,
-        "time_slot": appointment_data.time_slot,
-        "status": {"$nin": ["cancelled", "no_show"]}
-    })
+    existing = await Appointment.find_one(overlap_filter(
+        appointment_data.car_id,
+        appointment_data.scheduled_date,
+        appointment_data.time_slot,
+        appointment_data.duration
+    ))
     
     if existing:
         raise HTTPException(status_code=400, detail="Time slot already occupied")
@@ -120,35 +316,51 @@ async def create_appointment(appointment_data: Appointment):
 
 
 @router.put("/{appointment_id}", response_model=Appointment)
-async def update_appointment(appointment_id: PydanticObjectId, update_data: dict = Body(...)):
+async def update_appointment(
+    appointment_id: PydanticObjectId,
+    update_data: dict = Body(...),
+    expected_version: Optional[int] = Query(None, description="Reject the update if the stored version differs")
+):
     """
     Update appointment (reschedule, change status, etc.)
     """
-    appointment = await Appointment.get(appointment_id)
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
+    # Fields managed by the server are never taken from the request body
+    for field in ("_id", "id", "version", "created_at"):
+        update_data.pop(field, None)
     
-    # If rescheduling, check conflicts
-    if "time_slot" in update_data or "scheduled_date" in update_data:
-        new_date = update_data.get("scheduled_date", appointment.scheduled_date)
-        new_time = update_data.get("time_slot", appointment.time_slot)
-        new_car = update_data.get("car_id", appointment.car_id)
+    # If rescheduling, check conflicts and rewrite the derived start/end fields
+    if any(field in update_data for field in ("time_slot", "scheduled_date", "duration", "car_id")):
+        current = await Appointment.get_motor_collection().find_one(
+            {"_id": appointment_id},
+            projection={"scheduled_date": 1, "time_slot": 1, "duration": 1, "car_id": 1}
+        )
+        if not current:
+            raise HTTPException(status_code=404, detail="Appointment not found")
+        
+        if "scheduled_date" in update_data:
+            update_data["scheduled_date"] = _valid_scheduled_date(update_data["scheduled_date"])
+        if "time_slot" in update_data:
+            update_data["time_slot"] = _valid_time_slot(update_data["time_slot"])
+        if "duration" in update_data:
+            update_data["duration"] = _valid_duration(update_data["duration"])
+        new_date = update_data.get("scheduled_date", current["scheduled_date"])
+        new_time = _valid_time_slot(update_data.get("time_slot", current.get("time_slot")))
+        new_duration = update_data.get("duration", current["duration"])
+        new_car = update_data.get("car_id", current["car_id"])
         
         conflict = await Appointment.find_one({
             "_id": {"$ne": appointment_id},
-            "car_id": new_car,
-            "scheduled_date": new_date,
-            "time_slot": new_time,
-            "status": {"$nin": ["cancelled", "no_show"]}
+            **overlap_filter(new_car, new_date, new_time, new_duration)
         })
         
         if conflict:
             raise HTTPException(status_code=400, detail="Time slot already occupied")
+        
+        update_data.update(schedule_fields(new_date, new_time, new_duration))
     
-    # Update
+    # Update in a single round-trip, returning the post-image
     update_data["updated_at"] = datetime.utcnow()
-    await appointment.update({"$set": update_data})
-    await appointment.sync()
+    appointment = await find_one_and_update(Appointment, appointment_id, update_data, expected_version)
     
     return appointment
 
@@ -157,62 +369,234 @@ async def update_appointment(appointment_id: PydanticObjectId, update_data: dict
 async def upload_schedule(file: UploadFile = File(...)):
     """
     Upload Excel/CSV file and process schedule
+    
+    Re-uploading a file for the same day only applies the rows that were
+    added, changed or removed since the previous upload.
     """
     if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload Excel or CSV file")
     
     try:
-        # Read file
         contents = await file.read()
+        return await import_schedule(contents, file.filename)
         
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        else:
-            df = pd.read_excel(io.BytesIO(contents))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+
+
+@router.post("/bulk")
+async def bulk_appointments(request: BulkRequest):
+    """
+    Confirm, reschedule, cancel or reassign many appointments at once
+    
+    The whole batch is validated in memory against the current schedule
+    (including slots taken by earlier items of the same batch) and the
+    valid items are written with a single bulk_write.
+    """
+    operations = request.operations
+    collection = Appointment.get_motor_collection()
+    
+    # Load every referenced appointment in one query
+    ids = list({op.appointment_id for op in operations})
+    appointments = {
+        doc["_id"]: doc async for doc in collection.find(
+            {"_id": {"$in": ids}},
+            projection={"car_id": 1, "scheduled_date": 1, "time_slot": 1, "duration": 1, "status": 1, "version": 1}
+        )
+    }
+    
+    # Work out which (car, day) schedules the batch can touch
+    targets = {}
+    for index, op in enumerate(operations):
+        current = appointments.get(op.appointment_id)
+        if not current or op.action not in ("reschedule", "reassign_car"):
+            continue
+        new_date = _midnight(op.scheduled_date) if op.scheduled_date else current["scheduled_date"]
+        targets[index] = (op.car_id or current["car_id"], new_date, op.time_slot or current["time_slot"])
+    
+    cars = {car_id: await car_registry.get(car_id) for car_id, _, _ in targets.values()}
+    
+    # Snapshot occupied intervals (minutes since midnight) for the affected schedules
+    occupied = {}
+    days = {(car_id, day) for car_id, day, _ in targets.values()}
+    if days:
+        cursor = collection.find(
+            {
+                "$or": [{"car_id": car_id, "scheduled_date": day} for car_id, day in days],
+                "status": {"$nin": INACTIVE_STATUSES}
+            },
+            projection={"car_id": 1, "scheduled_date": 1, "time_slot": 1, "duration": 1}
+        )
+        async for doc in cursor:
+            try:
+                start = parse_time_slot(doc["time_slot"])
+            except ValueError:
+                continue
+            occupied.setdefault((doc["car_id"], doc["scheduled_date"]), {})[doc["_id"]] = (start, start + doc["duration"])
+    
+    # Validate each item in order, simulating its effect on the schedule
+    # (MongoDB keeps millisecond precision, so trim now to match it later)
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    results = []
+    writes = []
+    seen = set()
+    for index, op in enumerate(operations):
+        outcome = {"index": index, "appointment_id": str(op.appointment_id), "action": op.action}
+        results.append(outcome)
+        current = appointments.get(op.appointment_id)
         
-        # Process the dataframe (this is a simplified version)
-        # In production, you'd port the JavaScript fileProcessor logic here
+        error = None
+        if not current:
+            error = "Appointment not found"
+        elif op.appointment_id in seen:
+            error = "Appointment appears more than once in the batch"
+        elif op.expected_version is not None and op.expected_version != current.get("version", 0):
+            error = "Appointment was modified by another request"
+        elif op.action == "reschedule" and not (op.scheduled_date or op.time_slot):
+            error = "scheduled_date or time_slot is required to reschedule"
+        elif op.action == "reassign_car" and not op.car_id:
+            error = "car_id is required to reassign"
+        elif index in targets and not _is_time_slot(targets[index][2]):
+            error = "Stored time_slot is invalid; send a new time_slot"
         
-        processed_count = 0
-        errors = []
+        fields = {}
+        if not error and index in targets:
+            car_id, day, slot = targets[index]
+            car = cars.get(car_id)
+            start = parse_time_slot(slot)
+            end = start + current["duration"]
+            schedule = occupied.setdefault((car_id, day), {})
+            overlapping = any(
+                other_start < end and other_end > start
+                for other_id, (other_start, other_end) in schedule.items()
+                if other_id != op.appointment_id
+            )
+            if not car or not car.active:
+                error = "Car not found"
+            elif day in car.unavailable_dates:
+                error = "Car unavailable on this date"
+            elif overlapping:
+                error = "Time slot already occupied"
+            else:
+                occupied.get((current["car_id"], current["scheduled_date"]), {}).pop(op.appointment_id, None)
+                schedule[op.appointment_id] = (start, end)
+                fields = {
+                    "car_id": car_id,
+                    "scheduled_date": day,
+                    "time_slot": slot,
+                    **schedule_fields(day, slot, current["duration"])
+                }
+                if op.action == "reschedule":
+                    fields["status"] = "rescheduled"
         
-        # Example processing (you'd implement the full logic)
-        for idx, row in df.iterrows():
-            try:
-                # Extract data from row
-                # Create patient if not exists
-                # Create appointment
-                processed_count += 1
-            except Exception as e:
-                errors.append(f"Row {idx + 1}: {str(e)}")
+        if error:
+            outcome.update({"success": False, "error": error})
+            continue
         
-        return {
-            "filename": file.filename,
-            "total_rows": len(df),
-            "processed": processed_count,
-            "errors": errors
-        }
+        if op.action == "confirm":
+            fields = {
+                "confirmation.status": "confirmed",
+                "confirmation.confirmed_at": now,
+                "confirmation.confirmed_by": op.confirmed_by,
+                "confirmation.method": op.method
+            }
+        elif op.action == "cancel":
+            fields = {"status": "cancelled", "confirmation.status": "cancelled"}
+            occupied.get((current["car_id"], current["scheduled_date"]), {}).pop(op.appointment_id, None)
+        if op.notes is not None:
+            fields["confirmation.notes"] = op.notes
+        fields["updated_at"] = now
         
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+        seen.add(op.appointment_id)
+        writes.append(UpdateOne(
+            {"_id": op.appointment_id, "version": version_filter(current.get("version", 0))},
+            {"$set": fields, "$inc": {"version": 1}}
+        ))
+        outcome["success"] = True
+    
+    if writes:
+        result = await collection.bulk_write(writes, ordered=False)
+        
+        # Items whose version moved between validation and write lost the race
+        if result.matched_count < len(writes):
+            applied = {
+                doc["_id"] async for doc in collection.find(
+                    {"_id": {"$in": list(seen)}, "updated_at": now},
+                    projection={"_id": 1}
+                )
+            }
+            for outcome, op in zip(results, operations):
+                if outcome.get("success") and op.appointment_id not in applied:
+                    outcome.update({"success": False, "error": "Appointment was modified by another request"})
+    
+    succeeded = sum(1 for outcome in results if outcome["success"])
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
 
 
 @router.post("/{appointment_id}/confirm")
-async def confirm_appointment(appointment_id: PydanticObjectId, confirmation_data: dict = Body(...)):
+async def confirm_appointment(
+    appointment_id: PydanticObjectId,
+    confirmation_data: dict = Body(...),
+    expected_version: Optional[int] = Query(None, description="Reject the update if the stored version differs")
+):
     """
     Confirm an appointment
     """
-    appointment = await Appointment.get(appointment_id)
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
+    now = datetime.utcnow()
+    appointment = await find_one_and_update(Appointment, appointment_id, {
+        "confirmation.status": "confirmed",
+        "confirmation.confirmed_at": now,
+        "confirmation.confirmed_by": confirmation_data.get("confirmed_by"),
+        "confirmation.method": confirmation_data.get("method"),
+        "updated_at": now
+    }, expected_version)
     
-    # Update confirmation
-    appointment.confirmation.status = "confirmed"
-    appointment.confirmation.confirmed_at = datetime.utcnow()
-    appointment.confirmation.confirmed_by = confirmation_data.get("confirmed_by")
-    appointment.confirmation.method = confirmation_data.get("method")
+    return {
+        "message": "Appointment confirmed",
+        "appointment_id": str(appointment_id),
+        "version": appointment.version
+    }
+
+
+def _midnight(day: date) -> datetime:
+    """Convert a date into the midnight datetime stored in scheduled_date"""
+    return datetime.combine(day, datetime.min.time())
+
+
+def _build_filter(
+    date_from: Optional[date],
+    date_to: Optional[date],
+    car_id: Optional[str],
+    status: Optional[str]
+) -> dict:
+    """Build the appointment query shared by listing and export"""
+    query_filter = {}
     
-    appointment.updated_at = datetime.utcnow()
-    await appointment.save()
+    # Date range filter
+    if date_from or date_to:
+        date_filter = {}
+        if date_from:
+            date_filter["$gte"] = datetime.combine(date_from, datetime.min.time())
+        if date_to:
+            date_filter["$lte"] = datetime.combine(date_to, datetime.max.time())
+        query_filter["scheduled_date"] = date_filter
+    
+    if car_id:
+        query_filter["car_id"] = car_id
     
-    return {"message": "Appointment confirmed", "appointment_id": str(appointment_id)}
\ No newline at end of file
+    if status:
+        query_filter["status"] = status
+    
+    return query_filter
+
+
+def _car_name(car_id: str) -> str:
+    """Name of a car from the registry snapshot, without a database read"""
+    car = car_registry.by_id.get(car_id)
+    return car.name if car else ""
@@ -0,0 +1,245 @@
+"""
+Admission control for expensive routes
+
+Schedule analytics, schedule uploads and exports are grouped by path. Each
+group gets a bounded number of concurrent requests (ADMISSION_CONCURRENCY)
+plus a short wait queue, and each client a token bucket per group
+(RATE_LIMITS). Requests over either limit are answered with 429 and
+Retry-After instead of queueing behind the event loop and the Mongo pool, so
+booking latency stays stable. The limiter wraps the whole response,
+including streamed exports. Cheap coalesced reads (dashboard, calendar) are
+not limited.
+
+Clients are told apart by their authenticated user when there is one,
+otherwise by the address X-Forwarded-For reports through TRUSTED_PROXIES,
+so operators behind one proxy or NAT gateway don't share a bucket.
+"""
+import asyncio
+import ipaddress
+import math
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import settings
+from src.services.archive import archive_boundary
+
+# Path prefix -> admission group
+HEAVY_ROUTES: List[Tuple[str, str]] = [
+    ("/api/analytics/schedule", "analytics"),
+    ("/api/schedule/upload", "upload"),
+    ("/api/schedule/export", "export"),
+    ("/api/patients/export", "export"),
+]
+
+# Buckets idle this long are full again and can be dropped
+BUCKET_IDLE_SECONDS = 300
+
+
+def route_group(path: str) -> Optional[str]:
+    """Admission group of a request path, None for interactive routes"""
+    for prefix, group in HEAVY_ROUTES:
+        if path.startswith(prefix):
+            return group
+    return None
+
+
+def _trusted_proxy(address: str) -> bool:
+    """Whether `address` is one of TRUSTED_PROXIES (addresses or networks, "*" for any)"""
+    if "*" in settings.TRUSTED_PROXIES:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in ipaddress.ip_network(proxy, strict=False) for proxy in settings.TRUSTED_PROXIES)
+
+
+def client_identity(scope: Scope) -> str:
+    """Rate limit key of a request: authenticated user, else originating address"""
+    user = scope.get("user")
+    if user is not None and getattr(user, "is_authenticated", False):
+        return f"user:{user.display_name}"
+
+    peer = scope["client"][0] if scope.get("client") else "unknown"
+    if not _trusted_proxy(peer):
+        return peer
+
+    # Walk the chain back from our proxy; the first hop it didn't add itself is the client
+    forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def ensure_date_range(date_from: Optional[date], date_to: Optional[date]) -> None:
+    """
+    Reject ranges longer than MAX_DATE_RANGE_DAYS
+    
+    A missing date_to is measured up to today. A missing date_from is only
+    accepted while date_to stays out of the archive, since the range would
+    otherwise span the whole archive.
+    """
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    
+    if date_from is None:
+        boundary = archive_boundary().date()
+        if date_to and date_to < boundary:
+            raise HTTPException(
+                status_code=400,
+                detail=f"date_from is required when date_to is before {boundary.isoformat()}"
+            )
+        return
+    
+    end = date_to or max(date.today(), date_from)
+    if (end - date_from).days + 1 > settings.MAX_DATE_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range is limited to {settings.MAX_DATE_RANGE_DAYS} days"
+        )
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded number of waiters"""
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to `timeout`; False when the queue is full or the wait expires"""
+        if self.semaphore.locked() and self.waiting >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        self.semaphore.release()
+
+    @property
+    def active(self) -> int:
+        return self.concurrency - self.semaphore._value
+
+
+class RateLimiter:
+    """Per-client token buckets, one per admission group"""
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[str, str], List[float]] = {}
+        self.rejected: Dict[str, int] = {}
+
+    def take(self, group: str, client: str) -> float:
+        """Spend one token; returns 0 when allowed, otherwise seconds until a token is available"""
+        per_minute = settings.RATE_LIMITS.get(group)
+        if not per_minute:
+            return 0.0
+
+        rate = per_minute / 60
+        burst = max(1, settings.RATE_LIMIT_BURST)
+        now = time.monotonic()
+        if len(self.buckets) > 10000:
+            self._prune(now)
+
+        tokens, updated = self.buckets.get((group, client), (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self.buckets[(group, client)] = [tokens, now]
+            self.rejected[group] = self.rejected.get(group, 0) + 1
+            return (1 - tokens) / rate
+
+        self.buckets[(group, client)] = [tokens - 1, now]
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if now - bucket[1] < BUCKET_IDLE_SECONDS
+        }
+
+
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+rate_limiter = RateLimiter()
+
+
+def _limiter(group: str) -> Optional[ConcurrencyLimiter]:
+    concurrency = settings.ADMISSION_CONCURRENCY.get(group)
+    if not concurrency:
+        return None
+    if group not in _limiters:
+        _limiters[group] = ConcurrencyLimiter(concurrency, settings.ADMISSION_QUEUE_SIZE)
+    return _limiters[group]
+
+
+def _too_many(detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """Apply rate limits and concurrency limits to the routes in HEAVY_ROUTES"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        group = route_group(scope["path"]) if scope["type"] == "http" and scope["method"] != "OPTIONS" else None
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = rate_limiter.take(group, client_identity(scope))
+        if wait:
+            await _too_many(f"Rate limit exceeded for {group} requests", wait)(scope, receive, send)
+            return
+
+        limiter = _limiter(group)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire(settings.ADMISSION_QUEUE_TIMEOUT):
+            await _too_many(f"Too many {group} requests in progress", settings.ADMISSION_RETRY_AFTER)(
+                scope, receive, send
+            )
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+def admission_stats() -> Dict[str, Any]:
+    """Per-group concurrency and rejection counters"""
+    groups = set(_limiters) | set(rate_limiter.rejected)
+    return {
+        group: {
+            "active": _limiters[group].active if group in _limiters else 0,
+            "waiting": _limiters[group].waiting if group in _limiters else 0,
+            "rejected_busy": _limiters[group].rejected if group in _limiters else 0,
+            "rejected_rate": rate_limiter.rejected.get(group, 0),
+        }
+        for group in sorted(groups)
+    }
@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing of identical concurrent reads
+
+Requests to a coalesced route with the same normalized parameters share
+one in-flight computation within the worker instead of each running the
+same MongoDB queries.
+"""
+import asyncio
+import functools
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from src.core.config import settings
+
+_in_flight: Dict[Hashable, asyncio.Task] = {}
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "collapsed": 0})
+
+
+def _normalize(value: Any) -> Hashable:
+    """Turn query parameter values into an order-insensitive hashable key"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(str(_normalize(item)) for item in value))
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _key(name: str, kwargs: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    return (name,) + tuple(sorted((k, _normalize(v)) for k, v in kwargs.items()))
+
+
+def coalesce(name: str) -> Callable:
+    """
+    Collapse concurrent identical calls of an endpoint into one
+
+    Enabled per route through settings.COALESCE_ROUTES. The shared work runs
+    in its own task, so a client disconnecting does not cancel it for the
+    other waiters. Every waiter receives the same object, so the decorated
+    function must return plain data, never a Response, and callers must
+    not mutate it.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if name not in settings.COALESCE_ROUTES:
+                return await func(*args, **kwargs)
+
+            stats = _stats[name]
+            stats["requests"] += 1
+
+            key = _key(name, kwargs)
+            task = _in_flight.get(key)
+            if task is None:
+                task = asyncio.create_task(func(*args, **kwargs))
+                _in_flight[key] = task
+                task.add_done_callback(lambda done: _in_flight.pop(key, None) if _in_flight.get(key) is done else None)
+            else:
+                stats["collapsed"] += 1
+
+            return await asyncio.shield(task)
+
+        return wrapper
+
+    return decorator
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    """Per-route request and collapsed counters"""
+    return {
+        "in_flight": len(_in_flight),
+        "routes": {name: dict(counters) for name, counters in _stats.items()}
+    }
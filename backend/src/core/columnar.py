@@ -0,0 +1,28 @@
+"""
+Columnar response format
+
+`?format=columnar` replaces lists of objects with one array per field, so
+the field names of a month of appointments are sent once instead of once
+per row. Nested values (e.g. `confirmation`) stay as objects in their array.
+"""
+from typing import Any, Dict, List
+
+
+def to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """[{a: 1, b: 2}, {a: 3}] -> {a: [1, 3], b: [2, None]}"""
+    columns: Dict[str, List[Any]] = {}
+    for i, row in enumerate(rows):
+        for field in row:
+            if field not in columns:
+                columns[field] = [None] * i
+        for field, values in columns.items():
+            values.append(row.get(field))
+    return columns
+
+
+def mapping_to_columnar(mapping: Dict[str, Any], key: str, value: str = "count") -> Dict[str, List[Any]]:
+    """{k: v} -> {key: [k...], value: [v...]}; object values become one array per field"""
+    values = list(mapping.values())
+    if values and all(isinstance(item, dict) for item in values):
+        return {key: list(mapping), **to_columnar(values)}
+    return {key: list(mapping), value: values}
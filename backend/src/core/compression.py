@@ -0,0 +1,130 @@
+"""
+Negotiated response compression
+
+ASGI middleware choosing zstd, brotli or gzip from the request's
+Accept-Encoding. Complete JSON/text bodies of at least COMPRESSION_MIN_SIZE
+bytes are compressed; from COMPRESSION_THREAD_SIZE on, the work moves to a
+worker thread so a month of appointments doesn't stall the event loop.
+Streaming responses (exports) pass through unchanged. brotli and zstd are
+only offered when their packages are installed.
+"""
+import gzip
+from typing import Callable, Dict, List, Optional
+
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """Available encodings; levels favour speed, these run on every request"""
+    compressors = {"gzip": lambda body: gzip.compress(body, compresslevel=6, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=5)
+    if zstandard is not None:
+        compressors["zstd"] = lambda body: zstandard.ZstdCompressor(level=3).compress(body)
+    return compressors
+
+
+def negotiate(accept_encoding: str, preferred: List[str]) -> Optional[str]:
+    """Best encoding the client accepts; server preference order breaks ties"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in preferred:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compress complete response bodies with the negotiated encoding"""
+
+    def __init__(self, app: ASGIApp, encodings: List[str], minimum_size: int = 1024, thread_size: int = 262144):
+        self.app = app
+        compressors = _compressors()
+        self.compressors = {name: compressors[name] for name in encodings if name in compressors}
+        self.encodings = list(self.compressors)
+        self.minimum_size = minimum_size
+        self.thread_size = thread_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether it will be compressed. The
+                # header list is copied: it belongs to the Response object, which
+                # must not change under other requests sending it.
+                start = {**message, "headers": list(message["headers"])}
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            compressible = (
+                "content-encoding" not in headers
+                and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+
+            if not compressible or message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compress = self.compressors[encoding]
+            if len(body) >= self.thread_size:
+                body = await to_thread.run_sync(compress, body)
+            else:
+                body = compress(body)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
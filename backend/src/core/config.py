@@ -1,7 +1,7 @@
 """
 Application configuration using Pydantic Settings
 """
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -18,6 +18,7 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str = Field(default="mongodb://localhost:27017")
     MONGODB_DB_NAME: str = Field(default="lab_scheduler")
+    DB_INDEX_MODE: str = Field(default="startup", pattern="^(startup|background|skip)$")
     
     # CORS
     CORS_ORIGINS: List[str] = Field(
@@ -32,6 +33,65 @@ class Settings(BaseSettings):
     # File Upload
     MAX_UPLOAD_SIZE: int = Field(default=10485760)  # 10MB
     
+    # Admission control for schedule analytics, uploads and exports
+    ADMISSION_CONCURRENCY: Dict[str, int] = Field(
+        default={"analytics": 4, "upload": 2, "export": 2}
+    )  # concurrent requests per route group and worker
+    ADMISSION_QUEUE_SIZE: int = Field(default=8)  # requests allowed to wait for a slot
+    ADMISSION_QUEUE_TIMEOUT: float = Field(default=15.0)  # seconds before a waiting request gets 429
+    ADMISSION_RETRY_AFTER: int = Field(default=5)  # Retry-After seconds when all slots are busy
+    RATE_LIMITS: Dict[str, int] = Field(
+        default={"analytics": 60, "upload": 10, "export": 20}
+    )  # requests per minute per client and route group
+    RATE_LIMIT_BURST: int = Field(default=10)
+    TRUSTED_PROXIES: List[str] = Field(default=["127.0.0.1"])  # whose X-Forwarded-For identifies the client
+    MAX_DATE_RANGE_DAYS: int = Field(default=92)
+    
+    # Response compression
+    COMPRESSION_ENCODINGS: List[str] = Field(default=["zstd", "br", "gzip"])  # server preference order
+    COMPRESSION_MIN_SIZE: int = Field(default=1024)  # bytes; smaller bodies are sent as-is
+    COMPRESSION_THREAD_SIZE: int = Field(default=262144)  # bytes; larger bodies compress in a thread
+    
+    # Serve large DB reads without re-validating documents through Pydantic
+    TRUSTED_READS: bool = Field(default=True)
+    
+    # Car registry
+    CAR_REGISTRY_TTL: int = Field(default=60)  # seconds before cars are reloaded regardless of change events
+    
+    # Request coalescing (routes sharing one in-flight computation)
+    COALESCE_ROUTES: List[str] = Field(
+        default=["calendar", "dashboard", "patient_analytics", "schedule_analytics", "confirmation_analytics"]
+    )
+    
+    # Archive
+    ARCHIVE_AFTER_DAYS: int = Field(default=180)  # appointments older than this move to the archive
+    ARCHIVE_INTERVAL_HOURS: int = Field(default=24)  # 0 disables the scheduled archiver
+    ARCHIVE_BATCH_SIZE: int = Field(default=1000)
+    ARCHIVE_LEASE_SECONDS: int = Field(default=300)  # renewed while a run moves batches
+    
+    # No-show risk scoring
+    RISK_SCORING_INTERVAL_HOURS: int = Field(default=24)  # 0 disables the scheduled run
+    RISK_SCORING_CHUNK_SIZE: int = Field(default=5000)  # patients scored per bulk_write
+    RISK_SCORING_LEASE_SECONDS: int = Field(default=300)  # renewed while a pass runs
+    RISK_MEDIUM_THRESHOLD: float = Field(default=0.15)  # no-show probability
+    RISK_HIGH_THRESHOLD: float = Field(default=0.35)
+    
+    # Confirmation campaigns
+    CONFIRMATION_CHANNEL: str = Field(default="fake")  # adapter registered in src.services.channels
+    CONFIRMATION_CAMPAIGN_HOUR: int = Field(default=9, ge=0, le=23)  # local hour to queue tomorrow's messages
+    DISPATCH_INTERVAL_SECONDS: int = Field(default=30)  # 0 disables the campaign loop
+    DISPATCH_BATCH_SIZE: int = Field(default=100)
+    DISPATCH_CONCURRENCY: int = Field(default=10)  # messages in flight per dispatcher
+    DISPATCH_LEASE_SECONDS: int = Field(default=120)
+    DISPATCH_MAX_ATTEMPTS: int = Field(default=3)
+    DISPATCH_RETRY_SECONDS: int = Field(default=60)  # doubled after each failed attempt
+    
+    # Geo
+    ZONE_INDEX_TTL: int = Field(default=300)  # seconds before zones are reloaded
+    ZONE_GRID_SIZE: float = Field(default=0.01)  # grid cell size in degrees (~1 km)
+    GEOCODER_URL: Optional[str] = Field(default=None)  # Nominatim-compatible search endpoint
+    GEOCODER_CONCURRENCY: int = Field(default=4)  # lookups in flight per geocode_many call
+    
     # Model configuration
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,139 @@
+"""
+Database maintenance commands
+
+Usage:
+    python -m src.db.migrate indexes
+    python -m src.db.migrate backfill-times
+    python -m src.db.migrate backfill-versions
+    python -m src.db.migrate archive
+    python -m src.db.migrate risk-scores
+"""
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from src.core.config import settings
+from src.db.mongodb import DOCUMENT_MODELS, init_db, close_db
+from src.models.appointment import time_slot_minutes_expression
+from src.services.archive import archive_boundary, run_archive_pass
+from src.services.risk_scoring import run_scoring_pass
+
+
+async def create_indexes(allow_index_dropping: bool = False):
+    """Check or create every model index"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        await init_beanie(
+            database=client[settings.MONGODB_DB_NAME],
+            document_models=DOCUMENT_MODELS,
+            allow_index_dropping=allow_index_dropping
+        )
+        print(f"Indexes ready for {len(DOCUMENT_MODELS)} collections")
+    finally:
+        client.close()
+
+
+async def backfill_times():
+    """Fill start_at/end_at/start_minute on appointments and minute fields on cars"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database = client[settings.MONGODB_DB_NAME]
+    try:
+        # Pipeline updates run server-side, so no document leaves MongoDB
+        result = await database.appointments.update_many(
+            {"start_at": None, "time_slot": {"$type": "string"}},
+            [
+                {"$set": {"start_minute": time_slot_minutes_expression("$time_slot")}},
+                {"$set": {"start_at": {"$add": [
+                    {"$dateTrunc": {"date": "$scheduled_date", "unit": "day"}},
+                    {"$multiply": ["$start_minute", 60000]}
+                ]}}},
+                {"$set": {"end_at": {"$add": ["$start_at", {"$multiply": ["$duration", 60000]}]}}}
+            ]
+        )
+        print(f"Backfilled {result.modified_count} appointments")
+
+        result = await database.cars.update_many(
+            {"working_hours.start_minute": None},
+            [{"$set": {
+                "working_hours.start_minute": time_slot_minutes_expression("$working_hours.start_time"),
+                "working_hours.end_minute": time_slot_minutes_expression("$working_hours.end_time"),
+                "working_hours.break_start_minute": {"$cond": [
+                    {"$eq": [{"$type": "$working_hours.break_start"}, "string"]},
+                    time_slot_minutes_expression("$working_hours.break_start"),
+                    None
+                ]}
+            }}]
+        )
+        print(f"Backfilled {result.modified_count} cars")
+    finally:
+        client.close()
+
+
+async def backfill_versions():
+    """Set version 0 on appointments and patients written before versioning"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database = client[settings.MONGODB_DB_NAME]
+    try:
+        for name in ("appointments", "appointments_archive", "patients"):
+            result = await database[name].update_many({"version": {"$exists": False}}, {"$set": {"version": 0}})
+            print(f"Backfilled version on {result.modified_count} {name}")
+    finally:
+        client.close()
+
+
+async def archive():
+    """Move appointments past the archive horizon into appointments_archive"""
+    await init_db()
+    try:
+        moved = await run_archive_pass()
+        if moved is None:
+            print("Another archive run is in progress")
+            return
+        print(f"Archived {moved} appointments scheduled before {archive_boundary().date()}")
+    finally:
+        await close_db()
+
+
+async def risk_scores():
+    """Recompute no-show risk scores for every patient with appointment history"""
+    await init_db()
+    try:
+        result = await run_scoring_pass()
+        if result is None:
+            print("Another risk scoring pass is running")
+            return
+        print(f"Scored {result['scored']} patients in {result['seconds']}s "
+              f"(overall no-show rate {result['overall_no_show_rate']:.1%})")
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lab Scheduler database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    indexes = commands.add_parser("indexes", help="Create model indexes")
+    indexes.add_argument("--drop-unknown", action="store_true", help="Drop indexes no model declares")
+
+    commands.add_parser("backfill-times", help="Fill derived start/end time fields")
+    commands.add_parser("backfill-versions", help="Set version 0 where it is missing")
+    commands.add_parser("archive", help="Move old appointments to the archive collection")
+    commands.add_parser("risk-scores", help="Recompute patient no-show risk scores")
+
+    args = parser.parse_args()
+    if args.command == "indexes":
+        asyncio.run(create_indexes(allow_index_dropping=args.drop_unknown))
+    elif args.command == "backfill-times":
+        asyncio.run(backfill_times())
+    elif args.command == "backfill-versions":
+        asyncio.run(backfill_versions())
+    elif args.command == "archive":
+        asyncio.run(archive())
+    elif args.command == "risk-scores":
+        asyncio.run(risk_scores())
+
+
+if __name__ == "__main__":
+    main()
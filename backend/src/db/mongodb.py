@@ -1,33 +1,101 @@
 """
 MongoDB connection and initialization
 """
+import asyncio
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
+from beanie.odm.utils.init import Initializer
 from src.core.config import settings
 from src.models.patient import Patient
-from src.models.appointment import Appointment
+from src.models.appointment import Appointment, ArchivedAppointment
 from src.models.car import Car
+from src.models.schedule_import import ScheduleImport
+from src.models.zone import Zone, GeocodeCache
+from src.models.outbound_message import OutboundMessage
+from src.models.job_lease import JobLease
+
+# Document models registered with Beanie
+DOCUMENT_MODELS = [
+    Patient,
+    Appointment,
+    ArchivedAppointment,
+    Car,
+    ScheduleImport,
+    Zone,
+    GeocodeCache,
+    OutboundMessage,
+    JobLease,
+]
+
+# Models whose writes rely on a unique index (natural-key upserts, duplicate
+# key handling). Their indexes are always checked before serving traffic.
+UNIQUE_INDEX_MODELS = [
+    Patient,
+    Car,
+    ScheduleImport,
+    Zone,
+    GeocodeCache,
+    OutboundMessage,
+]
 
 # Global MongoDB client
 motor_client: AsyncIOMotorClient = None
 
+# Background index build started by init_db in "background" mode
+index_task: Optional[asyncio.Task] = None
+
+
+class DeferredIndexInitializer(Initializer):
+    """
+    Beanie initializer that defers index creation for most models
+    
+    Models in UNIQUE_INDEX_MODELS still get their indexes during
+    initialization: until a unique index exists, concurrent upserts on its
+    key can insert duplicates.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deferred_models = []
+    
+    async def init_indexes(self, cls, allow_index_dropping: bool = False):
+        if cls in UNIQUE_INDEX_MODELS:
+            await super().init_indexes(cls, allow_index_dropping)
+        else:
+            self.deferred_models.append(cls)
+    
+    async def create_indexes(self):
+        """Check or create the indexes skipped during initialization"""
+        for cls in self.deferred_models:
+            await Initializer.init_indexes(self, cls, self.allow_index_dropping)
+        print(f"Indexes ready for {len(self.deferred_models)} collections")
+
 
 async def init_db():
-    """Initialize MongoDB connection and Beanie ODM"""
-    global motor_client
+    """
+    Initialize MongoDB connection and Beanie ODM
+    
+    DB_INDEX_MODE controls index creation: "startup" checks every index
+    before serving traffic, "background" does it after startup and "skip"
+    leaves it to `python -m src.db.migrate indexes`. In the last two modes
+    the unique indexes of UNIQUE_INDEX_MODELS are still created up front.
+    """
+    global motor_client, index_task
     
     # Create Motor client
     motor_client = AsyncIOMotorClient(settings.MONGODB_URL)
+    database = motor_client[settings.MONGODB_DB_NAME]
     
     # Initialize Beanie with document models
-    await init_beanie(
-        database=motor_client[settings.MONGODB_DB_NAME],
-        document_models=[
-            Patient,
-            Appointment,
-            Car,
-        ]
-    )
+    if settings.DB_INDEX_MODE == "startup":
+        await init_beanie(database=database, document_models=DOCUMENT_MODELS)
+    else:
+        initializer = DeferredIndexInitializer(database=database, document_models=DOCUMENT_MODELS)
+        await initializer
+        if settings.DB_INDEX_MODE == "background":
+            index_task = asyncio.create_task(initializer.create_indexes())
     
     print(f"Connected to MongoDB: {settings.MONGODB_DB_NAME}")
 
@@ -36,6 +104,9 @@ async def close_db():
     """Close MongoDB connection"""
     global motor_client
     
+    if index_task and not index_task.done():
+        index_task.cancel()
+    
     if motor_client:
         motor_client.close()
-        print("Disconnected from MongoDB")
\ No newline at end of file
+        print("Disconnected from MongoDB")
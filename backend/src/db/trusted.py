@@ -0,0 +1,94 @@
+"""
+Trusted reads: serve documents straight from MongoDB
+
+Data read back from our own collections was validated when it was written,
+so large read paths can skip building Pydantic models (and FastAPI's second
+pass against response_model) and encode the raw documents directly, with
+`_id` as a string and datetimes in ISO format. Inbound writes are still
+validated by the models.
+
+Documents written before a field existed lack it, so with_defaults() adds
+the model defaults (at every nesting level) to keep the JSON shape the same
+as the validated path. Values computed by model validators are not
+recomputed; the endpoints fill the ones they rely on.
+"""
+import functools
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+from uuid import UUID
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (ObjectId, UUID)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """Model held by a field annotation, and whether it is a list of them"""
+    origin = get_origin(annotation)
+    if origin is list or origin is List:
+        args = get_args(annotation)
+        return (_nested_model(args[0])[0] if args else None), True
+    if origin is Union:
+        for arg in get_args(annotation):
+            if arg is not type(None):
+                return _nested_model(arg)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Optional[FieldInfo], Optional[Type[BaseModel]], bool], ...]:
+    """(document key, field when it has a default, nested model, is list) per serialized field"""
+    fields = []
+    for name, field in model.model_fields.items():
+        # Raw documents always carry `_id`; hidden fields (revision_id) are not serialized
+        if name == "id" or isinstance(field.json_schema_extra, dict) and field.json_schema_extra.get("hidden"):
+            continue
+        nested, many = _nested_model(field.annotation)
+        fields.append((field.alias or name, None if field.is_required() else field, nested, many))
+    return tuple(fields)
+
+
+def with_defaults(model: Type[BaseModel], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the defaults `model` would fill in to a raw document, in place"""
+    for key, field, nested, many in _fields(model):
+        if key not in doc:
+            if field is not None:
+                value = field.get_default(call_default_factory=True)
+                doc[key] = value.model_dump(by_alias=True) if isinstance(value, BaseModel) else value
+            continue
+        if nested is None:
+            continue
+        value = doc[key]
+        if many and isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    with_defaults(nested, item)
+        elif isinstance(value, dict):
+            with_defaults(nested, value)
+    return doc
+
+
+class TrustedJSONResponse(JSONResponse):
+    """JSON response for raw MongoDB documents, bypassing model validation"""
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content,
+            default=_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
@@ -0,0 +1,50 @@
+"""
+Optimistic concurrency helpers
+"""
+from typing import Any, Optional, Type, TypeVar
+
+from beanie import Document, PydanticObjectId
+from beanie.odm.queries.update import UpdateResponse
+from fastapi import HTTPException
+
+DocumentType = TypeVar("DocumentType", bound=Document)
+
+
+def version_filter(version: int) -> Any:
+    """
+    Query value matching a stored document version
+    
+    Documents written before versioning was introduced have no `version`
+    field and count as version 0 until `python -m src.db.migrate
+    backfill-versions` has run.
+    """
+    return version if version else {"$in": [0, None]}
+
+
+async def find_one_and_update(
+    model: Type[DocumentType],
+    document_id: PydanticObjectId,
+    fields: dict,
+    expected_version: Optional[int] = None
+) -> DocumentType:
+    """
+    Apply a targeted $set and bump the version atomically, returning the post-image
+    
+    Raises 404 when the document does not exist and 409 when
+    expected_version no longer matches the stored document.
+    """
+    query_filter = {"_id": document_id}
+    if expected_version is not None:
+        query_filter["version"] = version_filter(expected_version)
+    
+    document = await model.find_one(query_filter).update(
+        {"$set": fields, "$inc": {"version": 1}},
+        response_type=UpdateResponse.NEW_DOCUMENT
+    )
+    if document:
+        return document
+    
+    # Only the failure path pays for a second round-trip
+    if expected_version is not None and await model.find_one({"_id": document_id}):
+        raise HTTPException(status_code=409, detail=f"{model.__name__} was modified by another request")
+    raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
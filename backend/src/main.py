@@ -1,13 +1,21 @@
 """
 Main FastAPI application entry point
 """
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from src.core.config import settings
 from src.db.mongodb import init_db, close_db
-from src.api.endpoints import patients, schedule, analytics
+from src.services.archive import run_archiver
+from src.services.risk_scoring import run_risk_scoring
+from src.services.campaigns import run_campaigns
+from src.core.coalescing import coalescing_stats
+from src.core.compression import CompressionMiddleware
+from src.core.admission import AdmissionMiddleware, admission_stats
+from src.services.car_registry import car_registry, watch_cars
+from src.api.endpoints import patients, schedule, analytics, geo, campaigns
 
 
 @asynccontextmanager
@@ -15,8 +23,17 @@ async def lifespan(app: FastAPI):
     """Handle startup and shutdown events"""
     # Startup
     await init_db()
+    await car_registry.load()
+    car_watcher = asyncio.create_task(watch_cars())
+    archiver = asyncio.create_task(run_archiver()) if settings.ARCHIVE_INTERVAL_HOURS > 0 else None
+    scorer = asyncio.create_task(run_risk_scoring()) if settings.RISK_SCORING_INTERVAL_HOURS > 0 else None
+    dispatcher = asyncio.create_task(run_campaigns()) if settings.DISPATCH_INTERVAL_SECONDS > 0 else None
     yield
     # Shutdown
+    car_watcher.cancel()
+    for task in (archiver, scorer, dispatcher):
+        if task:
+            task.cancel()
     await close_db()
 
 
@@ -28,6 +45,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Bound concurrency and per-client rate of expensive routes (inside CORS, so 429s carry CORS headers)
+app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -37,10 +57,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses for slow clinic links
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=settings.COMPRESSION_ENCODINGS,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    thread_size=settings.COMPRESSION_THREAD_SIZE,
+)
+
 # Include routers
 app.include_router(patients.router, prefix="/api/patients", tags=["patients"])
 app.include_router(schedule.router, prefix="/api/schedule", tags=["schedule"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(geo.router, prefix="/api/geo", tags=["geo"])
+app.include_router(campaigns.router, prefix="/api/campaigns", tags=["campaigns"])
 
 
 @app.get("/")
@@ -57,4 +87,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Per-worker request coalescing and admission counters"""
+    return {"coalescing": coalescing_stats(), "admission": admission_stats()}
\ No newline at end of file
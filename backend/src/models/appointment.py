@@ -1,10 +1,72 @@
 """
 Appointment model for MongoDB with Beanie ODM
 """
-from datetime import datetime
-from typing import List, Optional
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 from beanie import Document, Link, Indexed
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+
+# "HH:MM", also accepting a single-digit hour ("8:00")
+TIME_SLOT_PATTERN = "^([01]?[0-9]|2[0-3]):[0-5][0-9]$"
+
+
+def parse_time_slot(time_slot: str) -> int:
+    """Convert an "HH:MM" time slot into minutes since midnight; ValueError when malformed"""
+    if not isinstance(time_slot, str) or not re.match(TIME_SLOT_PATTERN, time_slot):
+        raise ValueError(f"Invalid time slot {time_slot!r}, expected HH:MM")
+    hour, minute = time_slot.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def normalize_time_slot(time_slot: str) -> str:
+    """"8:00" -> "08:00"; ValueError when malformed"""
+    return "{:02d}:{:02d}".format(*divmod(parse_time_slot(time_slot), 60))
+
+
+def time_slot_minutes_expression(field: str) -> Dict[str, Any]:
+    """
+    Aggregation counterpart of parse_time_slot
+    
+    Evaluates to null instead of failing the whole pipeline when a stored
+    value is missing or malformed.
+    """
+    parts = {"$split": [{"$cond": [{"$eq": [{"$type": field}, "string"]}, field, ""]}, ":"]}
+    hour, minute = (
+        {"$convert": {"input": {"$arrayElemAt": [parts, index]}, "to": "int", "onError": None, "onNull": None}}
+        for index in (0, 1)
+    )
+    return {"$add": [{"$multiply": [hour, 60]}, minute]}
+
+
+def schedule_fields(scheduled_date: datetime, time_slot: str, duration: int) -> Dict[str, Any]:
+    """Derived start/end fields written alongside scheduled_date and time_slot"""
+    start_minute = parse_time_slot(time_slot)
+    start_at = scheduled_date.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=start_minute)
+    return {
+        "start_minute": start_minute,
+        "start_at": start_at,
+        "end_at": start_at + timedelta(minutes=duration),
+    }
+
+
+def overlap_filter(car_id: str, scheduled_date: datetime, time_slot: str, duration: int) -> Dict[str, Any]:
+    """
+    Query for active appointments of a car overlapping the given interval
+    
+    Documents written before start_at/end_at existed fall back to the old
+    exact time slot match until the backfill migration has run.
+    """
+    fields = schedule_fields(scheduled_date, time_slot, duration)
+    return {
+        "car_id": car_id,
+        "status": {"$nin": ["cancelled", "no_show"]},
+        "$or": [
+            {"start_at": {"$lt": fields["end_at"]}, "end_at": {"$gt": fields["start_at"]}},
+            {"start_at": None, "scheduled_date": scheduled_date, "time_slot": time_slot},
+        ]
+    }
 
 
 class Confirmation(BaseModel):
@@ -28,6 +90,11 @@ class Appointment(Document):
     time_slot: str = Field(..., description="Time in HH:MM format")
     duration: int = Field(..., ge=15, le=120, description="Duration in minutes")
     
+    # Derived from scheduled_date, time_slot and duration
+    start_at: Optional[datetime] = None
+    end_at: Optional[datetime] = None
+    start_minute: Optional[int] = Field(None, ge=0, lt=1440, description="Minutes since midnight")
+    
     # Appointment details
     exams: List[str] = Field(default_factory=list)
     special_instructions: Optional[str] = None
@@ -46,6 +113,13 @@ class Appointment(Document):
     actual_end_time: Optional[datetime] = None
     collected_by: Optional[str] = None
     
+    # Spreadsheet import tracking
+    import_key: Optional[str] = Field(None, description="Natural key of the source spreadsheet row")
+    import_hash: Optional[str] = Field(None, description="Hash of the imported row content")
+    
+    # Optimistic concurrency
+    version: int = Field(default=0, description="Incremented on every write")
+    
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -57,9 +131,31 @@ class Appointment(Document):
             "car_id",
             "scheduled_date",
             "status",
+            "import_key",
+            "start_at",
             [("scheduled_date", 1), ("car_id", 1)],  # Compound index
+            [("scheduled_date", 1), ("_id", 1)],  # Listing order
+            [("car_id", 1), ("start_at", 1), ("end_at", 1)],  # Overlap checks
+            [("confirmation.status", 1), ("scheduled_date", 1)],  # Confirmation campaigns
         ]
     
+    @model_validator(mode="after")
+    def fill_schedule_fields(self):
+        """
+        Keep the derived start/end fields in step with the time slot
+        
+        Writes validate the time slot up front; a malformed value already
+        stored leaves the derived fields empty so the document still loads.
+        """
+        try:
+            fields = schedule_fields(self.scheduled_date, self.time_slot, self.duration)
+        except ValueError:
+            return self
+        self.start_minute = fields["start_minute"]
+        self.start_at = fields["start_at"]
+        self.end_at = fields["end_at"]
+        return self
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -75,4 +171,17 @@ class Appointment(Document):
                     "attempts": 0
                 }
             }
-        }
\ No newline at end of file
+        }
+
+
+class ArchivedAppointment(Appointment):
+    """Appointment moved out of the hot collection once it ages past the archive horizon"""
+    archived_at: Optional[datetime] = None
+    
+    class Settings:
+        name = "appointments_archive"
+        indexes = [
+            "patient_id",
+            [("scheduled_date", 1), ("car_id", 1)],
+            [("scheduled_date", 1), ("_id", 1)],
+        ]
\ No newline at end of file
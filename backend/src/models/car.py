@@ -4,7 +4,17 @@ Car/Vehicle model for MongoDB with Beanie ODM
 from datetime import datetime, time
 from typing import List, Optional
 from beanie import Document, Indexed
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from src.models.appointment import parse_time_slot
+
+
+def _minutes(time_slot: str) -> Optional[int]:
+    """parse_time_slot, None when malformed"""
+    try:
+        return parse_time_slot(time_slot)
+    except ValueError:
+        return None
 
 
 class Driver(BaseModel):
@@ -21,6 +31,24 @@ class WorkingHours(BaseModel):
     end_time: str = Field(default="18:00", description="End time HH:MM")
     break_start: Optional[str] = Field(None, description="Break start HH:MM")
     break_duration: int = Field(default=60, description="Break duration in minutes")
+    
+    # Derived minutes since midnight
+    start_minute: Optional[int] = None
+    end_minute: Optional[int] = None
+    break_start_minute: Optional[int] = None
+    
+    @model_validator(mode="after")
+    def fill_minutes(self):
+        """
+        Keep the integer minute fields in step with the HH:MM strings
+        
+        A malformed stored value leaves its minute field empty, so the car
+        still loads (and the registry with it).
+        """
+        self.start_minute = _minutes(self.start_time)
+        self.end_minute = _minutes(self.end_time)
+        self.break_start_minute = _minutes(self.break_start) if self.break_start else None
+        return self
 
 
 class Car(Document):
@@ -55,7 +83,6 @@ class Car(Document):
     class Settings:
         name = "cars"
         indexes = [
-            "name",
             "active",
             "zones",
             "driver.name"
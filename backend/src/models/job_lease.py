@@ -0,0 +1,19 @@
+"""
+Job lease model for MongoDB with Beanie ODM
+"""
+from datetime import datetime
+from typing import Optional
+from beanie import Document
+from pydantic import Field
+
+
+class JobLease(Document):
+    """Cluster-wide lease on a background job, keyed by job name"""
+    id: str = Field(..., description="Job name, e.g. risk_scoring")
+    token: Optional[str] = Field(None, description="Token of the worker currently running the job")
+    locked_until: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Settings:
+        name = "job_leases"
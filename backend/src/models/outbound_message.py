@@ -0,0 +1,44 @@
+"""
+Outbound message queue model for MongoDB with Beanie ODM
+"""
+from datetime import datetime
+from typing import List, Optional
+from beanie import Document, Indexed
+from pydantic import Field
+
+
+class OutboundMessage(Document):
+    """Message waiting to be sent, or already sent, to a patient"""
+    campaign: str = Field(..., description="Campaign key, e.g. confirmation:2025-01-10")
+    dedupe_key: Indexed(str, unique=True)
+    patient_id: str
+    appointment_ids: List[str] = Field(default_factory=list)
+    
+    # Delivery
+    channel: str
+    recipient: str
+    body: str
+    status: str = Field(default="pending", pattern="^(pending|sending|sent|failed|responded)$")
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    claim: Optional[str] = Field(None, description="Token of the dispatcher currently sending")
+    locked_until: Optional[datetime] = None
+    external_id: Optional[str] = Field(None, description="Message id assigned by the channel")
+    last_error: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    
+    # Patient reply
+    response: Optional[str] = None
+    responded_at: Optional[datetime] = None
+    
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "outbound_messages"
+        indexes = [
+            "campaign",
+            "external_id",
+            [("status", 1), ("next_attempt_at", 1)],  # Dispatcher polling
+        ]
@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import List, Optional, Dict, Any
 from beanie import Document, Indexed
 from pydantic import BaseModel, Field, EmailStr
+from pymongo import ASCENDING, GEOSPHERE, IndexModel
 
 
 class Contact(BaseModel):
@@ -22,6 +23,7 @@ class Address(BaseModel):
     state: str = "RJ"
     zip_code: Optional[str] = None
     coordinates: Optional[List[float]] = Field(None, description="[longitude, latitude]")
+    zone: Optional[str] = Field(None, description="Service zone containing the coordinates")
     access_notes: Optional[str] = Field(None, description="Special access instructions")
 
 
@@ -111,6 +113,9 @@ class Patient(Document):
     # Analytics
     analytics: Analytics = Field(default_factory=Analytics)
     
+    # Optimistic concurrency
+    version: int = Field(default=0, description="Incremented on every write")
+    
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -119,11 +124,14 @@ class Patient(Document):
     class Settings:
         name = "patients"
         indexes = [
-            "personal_info.cpf",
+            # Indexed() on the nested PersonalInfo.cpf is not picked up by Beanie
+            IndexModel([("personal_info.cpf", ASCENDING)], unique=True),
             "personal_info.name",
             "status",
             "tags",
             "address.neighborhood",
+            "address.zone",
+            IndexModel([("address.coordinates", GEOSPHERE)]),
             "analytics.risk_score"
         ]
     
@@ -0,0 +1,30 @@
+"""
+Schedule import record model for MongoDB with Beanie ODM
+"""
+from datetime import datetime
+from typing import List
+from beanie import Document, Indexed
+from pydantic import Field
+
+
+class ScheduleImport(Document):
+    """Uploaded schedule file, identified by its content hash"""
+    file_hash: Indexed(str, unique=True)
+    filename: str
+    dates: List[datetime] = Field(default_factory=list, description="Days covered by the file")
+    
+    # Outcome
+    total_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "schedule_imports"
+        indexes = [
+            [("dates", 1), ("created_at", -1)],  # Latest import for a day
+        ]
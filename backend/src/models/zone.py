@@ -0,0 +1,61 @@
+"""
+Service zone model for MongoDB with Beanie ODM
+"""
+from datetime import datetime
+from typing import Any, List, Optional
+from beanie import Document, Indexed
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, GEOSPHERE
+
+
+class Geometry(BaseModel):
+    """GeoJSON polygon geometry"""
+    type: str = Field(..., pattern="^(Polygon|MultiPolygon)$")
+    coordinates: List[Any] = Field(..., description="GeoJSON coordinates, [longitude, latitude] pairs")
+
+
+class Zone(Document):
+    """Service zone (usually a neighborhood) with its boundary"""
+    name: Indexed(str, unique=True) = Field(..., description="Zone name, matching Car.zones")
+    city: str = "Rio de Janeiro"
+    geometry: Geometry
+    active: bool = True
+    
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "zones"
+        indexes = [
+            IndexModel([("geometry", GEOSPHERE)]),
+        ]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Copacabana",
+                "city": "Rio de Janeiro",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[
+                        [-43.1930, -22.9640],
+                        [-43.1650, -22.9640],
+                        [-43.1650, -22.9900],
+                        [-43.1930, -22.9900],
+                        [-43.1930, -22.9640]
+                    ]]
+                }
+            }
+        }
+
+
+class GeocodeCache(Document):
+    """Cached geocoding result for a normalized address"""
+    address_key: Indexed(str, unique=True)
+    coordinates: Optional[List[float]] = Field(None, description="[longitude, latitude], None when not found")
+    source: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "geocode_cache"
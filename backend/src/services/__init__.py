@@ -0,0 +1 @@
+# Lab Scheduler Services Package
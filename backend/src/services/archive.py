@@ -0,0 +1,118 @@
+"""
+Hot/cold tiering for appointments
+
+Appointments older than ARCHIVE_AFTER_DAYS are moved from `appointments`
+into `appointments_archive`, keeping the hot collection and its indexes
+sized to the weeks the calendar and dashboards actually read. Queries whose
+date range reaches past the boundary add a $unionWith stage over the archive.
+
+Archiving runs under a cluster-wide lease (see job_leases), so of all API
+workers only one moves a given batch.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import DeleteOne, ReplaceOne
+
+from src.core.config import settings
+from src.models.appointment import Appointment, ArchivedAppointment
+from src.services.job_leases import job_lease
+
+# Lease name, and how often each worker checks whether a run is due
+LEASE_NAME = "archive"
+SCHEDULE_CHECK_SECONDS = 600
+
+
+def archive_boundary() -> datetime:
+    """Appointments scheduled before this datetime live in the archive"""
+    return datetime.combine(date.today() - timedelta(days=settings.ARCHIVE_AFTER_DAYS), datetime.min.time())
+
+
+def includes_archive(start: Optional[datetime]) -> bool:
+    """Whether a range starting at `start` (None = unbounded) reaches the archive"""
+    return start is None or start < archive_boundary()
+
+
+def reaches_archive(start: Optional[datetime], end: Optional[datetime]) -> bool:
+    """Whether an explicit bound of a range lies in the archive; an unbounded range stays hot"""
+    return any(bound is not None and bound < archive_boundary() for bound in (start, end))
+
+
+def with_archive(match: Dict[str, Any], start: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Leading pipeline stages matching appointments across both tiers when needed"""
+    stages = [{"$match": match}]
+    if includes_archive(start):
+        stages.append({"$unionWith": {
+            "coll": ArchivedAppointment.get_collection_name(),
+            "pipeline": [{"$match": match}]
+        }})
+    return stages
+
+
+async def archive_appointments() -> int:
+    """
+    Move appointments older than the boundary into the archive, batch by batch
+
+    Each batch is copied before it is deleted, replacing any copy left by an
+    interrupted run, so a run can simply be repeated. A document is only
+    deleted if its version is still the one copied: an appointment updated
+    in between stays in the hot collection and is copied again next batch.
+    Callers take the lease first, see run_archive_pass().
+    """
+    hot = Appointment.get_motor_collection()
+    cold = ArchivedAppointment.get_motor_collection()
+    boundary = archive_boundary()
+    moved = 0
+
+    while True:
+        batch = await hot.find({"scheduled_date": {"$lt": boundary}}).limit(settings.ARCHIVE_BATCH_SIZE).to_list(
+            length=settings.ARCHIVE_BATCH_SIZE
+        )
+        if not batch:
+            return moved
+
+        now = datetime.utcnow()
+        for doc in batch:
+            doc["archived_at"] = now
+        await cold.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+
+        result = await hot.bulk_write(
+            [DeleteOne({"_id": doc["_id"], "version": doc.get("version")}) for doc in batch],
+            ordered=False
+        )
+        if not result.deleted_count:
+            # Every document of the batch changed meanwhile; leave them to the next run
+            return moved
+        moved += result.deleted_count
+
+
+async def run_archive_pass(min_interval: Optional[timedelta] = None) -> Optional[int]:
+    """
+    archive_appointments() under the lease
+
+    Returns None without archiving when another run holds the lease or, with
+    `min_interval`, when the last run started more recently than that.
+    """
+    async with job_lease(LEASE_NAME, settings.ARCHIVE_LEASE_SECONDS, min_interval) as acquired:
+        if not acquired:
+            return None
+        return await archive_appointments()
+
+
+async def run_archiver():
+    """
+    Archive old appointments every ARCHIVE_INTERVAL_HOURS
+
+    Every worker checks periodically; the lease lets the first one to find
+    a run due do it and makes the others skip.
+    """
+    interval = timedelta(hours=settings.ARCHIVE_INTERVAL_HOURS)
+    while True:
+        await asyncio.sleep(SCHEDULE_CHECK_SECONDS)
+        try:
+            moved = await run_archive_pass(interval)
+            if moved:
+                print(f"Archived {moved} appointments scheduled before {archive_boundary().date()}")
+        except Exception as e:
+            print(f"Archiving failed: {e}")
@@ -0,0 +1,288 @@
+"""
+Confirmation campaigns over a MongoDB-backed outbound queue
+
+Each day after CONFIRMATION_CAMPAIGN_HOUR, the pending appointments of the
+next day are grouped per patient and enqueued as one message each; the
+dedupe key makes enqueueing idempotent across runs and workers. Dispatchers
+claim batches with a lease, send with bounded concurrency through the
+configured channel and record outcomes with one bulk_write per batch.
+"""
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+
+from src.core.config import settings
+from src.models.appointment import Appointment
+from src.models.outbound_message import OutboundMessage
+from src.models.patient import Patient
+from src.services.channels import Channel, get_channel
+
+CONFIRMATION_TEMPLATE = (
+    "Olá {name}, sua coleta está agendada para {date} às {time}. "
+    "Local: {address}. Para confirmar, responda SIM."
+)
+
+# Appointment statuses that still expect the patient to show up
+CONFIRMABLE_STATUSES = ["scheduled", "rescheduled"]
+
+# First word of a patient reply -> confirmation status
+REPLIES = {
+    "SIM": "confirmed", "S": "confirmed", "1": "confirmed", "CONFIRMO": "confirmed", "OK": "confirmed",
+    "NAO": "cancelled", "NÃO": "cancelled", "N": "cancelled", "2": "cancelled", "CANCELAR": "cancelled",
+}
+
+
+def campaign_key(day: date) -> str:
+    return f"confirmation:{day.isoformat()}"
+
+
+def _recipient(contacts: List[Dict[str, Any]]) -> Optional[str]:
+    """Primary mobile number, falling back to any mobile, then any contact"""
+    mobiles = [c for c in contacts if c.get("type") == "mobile"]
+    for candidates in ([c for c in mobiles if c.get("primary")], mobiles, contacts):
+        if candidates:
+            return candidates[0]["value"]
+    return None
+
+
+async def enqueue_confirmations(day: date) -> Dict[str, Any]:
+    """Queue one confirmation message per patient with pending appointments on `day`"""
+    start = datetime.combine(day, datetime.min.time())
+    campaign = campaign_key(day)
+
+    # Served by the (confirmation.status, scheduled_date) index
+    groups = await Appointment.aggregate([
+        {"$match": {
+            "confirmation.status": "pending",
+            "scheduled_date": {"$gte": start, "$lt": start + timedelta(days=1)},
+            "status": {"$in": CONFIRMABLE_STATUSES},
+        }},
+        {"$sort": {"time_slot": 1}},
+        {"$group": {
+            "_id": "$patient_id",
+            "appointment_ids": {"$push": {"$toString": "$_id"}},
+            "time_slot": {"$first": "$time_slot"},
+        }},
+    ]).to_list()
+
+    ids = [ObjectId(group["_id"]) for group in groups if ObjectId.is_valid(group["_id"])]
+    patients = {
+        str(doc["_id"]): doc
+        async for doc in Patient.get_motor_collection().find(
+            {"_id": {"$in": ids}},
+            projection={"personal_info.name": 1, "contacts": 1, "address.street": 1, "address.neighborhood": 1}
+        )
+    }
+
+    channel = settings.CONFIRMATION_CHANNEL
+    writes = []
+    no_contact = 0
+    for group in groups:
+        patient = patients.get(group["_id"])
+        recipient = _recipient(patient.get("contacts", [])) if patient else None
+        if not recipient:
+            no_contact += 1
+            continue
+
+        address = patient.get("address", {})
+        message = OutboundMessage(
+            campaign=campaign,
+            dedupe_key=f"{campaign}:{group['_id']}",
+            patient_id=group["_id"],
+            appointment_ids=group["appointment_ids"],
+            channel=channel,
+            recipient=recipient,
+            body=CONFIRMATION_TEMPLATE.format(
+                name=patient["personal_info"]["name"].split()[0],
+                date=day.strftime("%d/%m/%Y"),
+                time=group["time_slot"],
+                address=", ".join(filter(None, [address.get("street"), address.get("neighborhood")])),
+            ),
+        )
+        writes.append(UpdateOne(
+            {"dedupe_key": message.dedupe_key},
+            {"$setOnInsert": message.model_dump(exclude={"id", "revision_id"})},
+            upsert=True
+        ))
+
+    enqueued = already_queued = 0
+    if writes:
+        result = await OutboundMessage.get_motor_collection().bulk_write(writes, ordered=False)
+        enqueued = result.upserted_count
+        already_queued = len(writes) - enqueued
+
+    return {
+        "campaign": campaign,
+        "patients": len(groups),
+        "enqueued": enqueued,
+        "already_queued": already_queued,
+        "no_contact": no_contact,
+    }
+
+
+async def _claim(now: datetime) -> List[OutboundMessage]:
+    """Lease up to DISPATCH_BATCH_SIZE ready messages to this dispatcher"""
+    collection = OutboundMessage.get_motor_collection()
+    ready = {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": now}},
+        # Lease expired: the dispatcher holding it died mid-send
+        {"status": "sending", "locked_until": {"$lt": now}},
+    ]}
+    cursor = collection.find(ready, projection={"_id": 1}).limit(settings.DISPATCH_BATCH_SIZE)
+    ids = [doc["_id"] async for doc in cursor]
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    await collection.update_many(
+        {"_id": {"$in": ids}, **ready},
+        {"$set": {
+            "status": "sending",
+            "claim": token,
+            "locked_until": now + timedelta(seconds=settings.DISPATCH_LEASE_SECONDS),
+        }}
+    )
+    return await OutboundMessage.find({"claim": token, "status": "sending"}).to_list()
+
+
+async def dispatch_batch(channel: Optional[Channel] = None) -> Dict[str, int]:
+    """Send one claimed batch and record the outcomes"""
+    channel = channel or get_channel()
+    now = datetime.utcnow()
+    messages = await _claim(now)
+    counts = {"sent": 0, "retrying": 0, "failed": 0}
+    if not messages:
+        return counts
+
+    semaphore = asyncio.Semaphore(settings.DISPATCH_CONCURRENCY)
+
+    async def deliver(message: OutboundMessage) -> Tuple[OutboundMessage, Optional[str], Optional[str]]:
+        async with semaphore:
+            try:
+                return message, await channel.send(message), None
+            except Exception as e:
+                return message, None, str(e) or type(e).__name__
+
+    writes = []
+    delivered: List[ObjectId] = []
+    for message, external_id, error in await asyncio.gather(*(deliver(m) for m in messages)):
+        attempts = message.attempts + 1
+        if error is None:
+            fields = {"status": "sent", "external_id": external_id, "sent_at": datetime.utcnow(), "last_error": None}
+            delivered.extend(ObjectId(i) for i in message.appointment_ids)
+            counts["sent"] += 1
+        elif attempts >= settings.DISPATCH_MAX_ATTEMPTS:
+            fields = {"status": "failed", "last_error": error}
+            counts["failed"] += 1
+        else:
+            backoff = settings.DISPATCH_RETRY_SECONDS * 2 ** (attempts - 1)
+            fields = {"status": "pending", "last_error": error, "next_attempt_at": now + timedelta(seconds=backoff)}
+            counts["retrying"] += 1
+
+        fields.update({"attempts": attempts, "claim": None, "locked_until": None, "updated_at": datetime.utcnow()})
+        # Guarded by the claim so a dispatcher whose lease expired cannot overwrite a newer outcome
+        writes.append(UpdateOne({"_id": message.id, "claim": message.claim}, {"$set": fields}))
+
+    await OutboundMessage.get_motor_collection().bulk_write(writes, ordered=False)
+
+    if delivered:
+        # One contact attempt per delivered message, counted server-side
+        await Appointment.get_motor_collection().update_many(
+            {"_id": {"$in": delivered}},
+            {"$set": {"updated_at": datetime.utcnow()}, "$inc": {"confirmation.attempts": 1, "version": 1}}
+        )
+    return counts
+
+
+async def dispatch_pending(channel: Optional[Channel] = None) -> Dict[str, int]:
+    """Send batches until no message is ready"""
+    totals = {"sent": 0, "retrying": 0, "failed": 0}
+    while True:
+        counts = await dispatch_batch(channel)
+        if not any(counts.values()):
+            return totals
+        for key, value in counts.items():
+            totals[key] += value
+
+
+def interpret_reply(reply: str) -> Optional[str]:
+    """Confirmation status a free-text reply stands for, if recognizable"""
+    words = reply.strip().upper().split()
+    return REPLIES.get(words[0].strip(".!,")) if words else None
+
+
+async def apply_responses(responses: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Record patient replies and update their appointments in bulk
+
+    Each response carries the channel's `external_id` (or the queue
+    `message_id`) and the `reply` text. Unrecognized replies are stored on
+    the message for an operator to follow up, without touching appointments.
+    """
+    external_ids = [r["external_id"] for r in responses if r.get("external_id")]
+    message_ids = [ObjectId(r["message_id"]) for r in responses if ObjectId.is_valid(r.get("message_id") or "")]
+    messages = await OutboundMessage.find({"$or": [
+        {"external_id": {"$in": external_ids}},
+        {"_id": {"$in": message_ids}},
+    ]}).to_list()
+    by_external = {m.external_id: m for m in messages if m.external_id}
+    by_id = {str(m.id): m for m in messages}
+
+    now = datetime.utcnow()
+    message_writes = []
+    appointment_writes = []
+    counts = {"confirmed": 0, "cancelled": 0, "unrecognized": 0, "unknown": 0}
+    for response in responses:
+        message = by_external.get(response.get("external_id")) or by_id.get(response.get("message_id"))
+        if not message:
+            counts["unknown"] += 1
+            continue
+
+        reply = response.get("reply", "")
+        outcome = interpret_reply(reply)
+        message_writes.append(UpdateOne({"_id": message.id}, {"$set": {
+            "status": "responded", "response": reply, "responded_at": now, "updated_at": now
+        }}))
+        if outcome is None:
+            counts["unrecognized"] += 1
+            continue
+
+        fields = {"confirmation.status": outcome, "confirmation.method": message.channel, "updated_at": now}
+        if outcome == "confirmed":
+            fields.update({"confirmation.confirmed_at": now, "confirmation.confirmed_by": "campaign"})
+        else:
+            fields.update({"status": "cancelled", "confirmation.notes": f"Patient replied: {reply}"})
+        appointment_writes.append(UpdateMany(
+            # Leave appointments an operator already handled alone
+            {"_id": {"$in": [ObjectId(i) for i in message.appointment_ids]}, "confirmation.status": "pending"},
+            {"$set": fields, "$inc": {"version": 1}}
+        ))
+        counts[outcome] += 1
+
+    if message_writes:
+        await OutboundMessage.get_motor_collection().bulk_write(message_writes, ordered=False)
+    if appointment_writes:
+        await Appointment.get_motor_collection().bulk_write(appointment_writes, ordered=False)
+    return counts
+
+
+async def run_campaigns():
+    """Enqueue tomorrow's confirmations once a day and drain the queue every DISPATCH_INTERVAL_SECONDS"""
+    enqueued_for = None
+    while True:
+        try:
+            tomorrow = date.today() + timedelta(days=1)
+            if datetime.now().hour >= settings.CONFIRMATION_CAMPAIGN_HOUR and enqueued_for != tomorrow:
+                result = await enqueue_confirmations(tomorrow)
+                enqueued_for = tomorrow
+                print(f"Campaign {result['campaign']}: {result['enqueued']} messages enqueued")
+            counts = await dispatch_pending()
+            if any(counts.values()):
+                print(f"Dispatched messages: {counts}")
+        except Exception as e:
+            print(f"Campaign dispatch failed: {e}")
+        await asyncio.sleep(settings.DISPATCH_INTERVAL_SECONDS)
@@ -0,0 +1,114 @@
+"""
+Process-local registry of cars
+
+The cars collection is tiny and read on every booking, calendar and import,
+so it is held in memory and indexed by id, name ('CARRO N') and zone. A
+change stream invalidates it on writes and is reopened after failovers;
+where change streams are unavailable (standalone MongoDB) the TTL alone
+bounds staleness.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from src.core.config import settings
+from src.models.car import Car
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+# Backoff between attempts to reopen the change stream
+WATCH_RETRY_MIN_SECONDS = 1
+WATCH_RETRY_MAX_SECONDS = 60
+
+
+class CarRegistry:
+    """In-memory car lookups, reloaded on invalidation or after CAR_REGISTRY_TTL"""
+
+    def __init__(self):
+        self.by_id: Dict[str, Car] = {}
+        self.by_name: Dict[str, Car] = {}
+        self.by_zone: Dict[str, List[Car]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        """Read every car from MongoDB and rebuild the indexes"""
+        cars = await Car.find_all().to_list()
+
+        by_zone: Dict[str, List[Car]] = {}
+        for car in cars:
+            for zone in car.zones:
+                by_zone.setdefault(zone, []).append(car)
+
+        self.by_id = {str(car.id): car for car in cars}
+        self.by_name = {car.name.upper(): car for car in cars}
+        self.by_zone = by_zone
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup"""
+        self._loaded_at = None
+
+    async def _fresh(self) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < settings.CAR_REGISTRY_TTL:
+            return
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= settings.CAR_REGISTRY_TTL:
+                await self.load()
+
+    async def get(self, car_id: str) -> Optional[Car]:
+        """Car by id"""
+        await self._fresh()
+        return self.by_id.get(str(car_id))
+
+    async def get_by_name(self, name: str) -> Optional[Car]:
+        """Car by its name, e.g. 'CARRO 1' (case-insensitive)"""
+        await self._fresh()
+        return self.by_name.get(name.upper())
+
+    async def in_zone(self, zone: str) -> List[Car]:
+        """Active cars serving a zone"""
+        await self._fresh()
+        return [car for car in self.by_zone.get(zone, []) if car.active]
+
+    async def active(self) -> List[Car]:
+        """All active cars"""
+        await self._fresh()
+        return [car for car in self.by_id.values() if car.active]
+
+
+car_registry = CarRegistry()
+
+
+async def watch_cars() -> None:
+    """
+    Invalidate the registry whenever the cars collection changes
+    
+    Transient errors (elections, failovers, dropped connections) reopen the
+    stream with exponential backoff, reloading the registry since events may
+    have been missed meanwhile. Only a server without change streams
+    (standalone) ends the watch, leaving the TTL in charge.
+    """
+    delay = WATCH_RETRY_MIN_SECONDS
+    while True:
+        try:
+            async with Car.get_motor_collection().watch() as stream:
+                if delay > WATCH_RETRY_MIN_SECONDS:
+                    print("Car change stream reopened")
+                delay = WATCH_RETRY_MIN_SECONDS
+                async for _ in stream:
+                    car_registry.invalidate()
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                print(f"Car change stream unavailable, relying on TTL: {e}")
+                return
+            print(f"Car change stream failed, retrying in {delay}s: {e}")
+        except PyMongoError as e:
+            print(f"Car change stream interrupted, retrying in {delay}s: {e}")
+        
+        car_registry.invalidate()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WATCH_RETRY_MAX_SECONDS)
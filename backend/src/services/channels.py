@@ -0,0 +1,61 @@
+"""
+Outbound channel adapters
+
+The campaign dispatcher only depends on Channel.send(). Real providers
+(SMS, WhatsApp) register an adapter under a name; CONFIRMATION_CHANNEL picks
+the one used. The "fake" channel keeps messages in memory for local runs
+and tests.
+"""
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from src.core.config import settings
+from src.models.outbound_message import OutboundMessage
+
+
+class ChannelError(Exception):
+    """Delivery failed; the message is retried until DISPATCH_MAX_ATTEMPTS"""
+
+
+class Channel:
+    """Base class for outbound channels"""
+    name: str = ""
+
+    async def send(self, message: OutboundMessage) -> str:
+        """Deliver a message and return the provider's message id"""
+        raise NotImplementedError
+
+
+class FakeChannel(Channel):
+    """Records messages instead of sending them"""
+    name = "fake"
+
+    def __init__(self):
+        self.sent: List[OutboundMessage] = []
+        self.fail_recipients: set = set()
+
+    async def send(self, message: OutboundMessage) -> str:
+        if message.recipient in self.fail_recipients:
+            raise ChannelError(f"Delivery to {message.recipient} failed")
+        self.sent.append(message)
+        return f"fake-{uuid.uuid4().hex}"
+
+
+_factories: Dict[str, Callable[[], Channel]] = {"fake": FakeChannel}
+_instances: Dict[str, Channel] = {}
+
+
+def register_channel(name: str, factory: Callable[[], Channel]) -> None:
+    """Make a channel available under CONFIRMATION_CHANNEL=<name>"""
+    _factories[name] = factory
+    _instances.pop(name, None)
+
+
+def get_channel(name: Optional[str] = None) -> Channel:
+    """The configured channel, created once per process"""
+    name = name or settings.CONFIRMATION_CHANNEL
+    if name not in _instances:
+        if name not in _factories:
+            raise ValueError(f"Unknown channel: {name}")
+        _instances[name] = _factories[name]()
+    return _instances[name]
@@ -0,0 +1,367 @@
+"""
+Spreadsheet processing shared by schedule imports and exports
+
+Column layout mirrors the DasaExp sheets handled by the frontend
+(frontend/src/services/fileProcessor.js), so an exported schedule can be
+uploaded again through /api/schedule/upload. Imported appointments keep
+their original 'ID Sala'; the others are exported with 'APT-<id>' so the
+importer maps the row back onto the same appointment. 'Status Confirmação'
+is read back with the same labels it is written with.
+"""
+import csv
+import hashlib
+import io
+import re
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.models.appointment import parse_time_slot
+
+# Expected DasaExp spreadsheet columns
+DASAEXP_COLUMNS = [
+    "ID Sala",
+    "Nome da Sala",
+    "Data/Hora Início",
+    "Data/Hora Fim",
+    "Nome do Paciente",
+    "Códigos dos Exames",
+    "Nomes dos Exames",
+    "Total Exames",
+    "Endereço Coleta",
+    "Pedido Médico",
+    "Canal Efetivação",
+    "Status Confirmação",
+    "Canal Confirmação",
+    "Documento(s) Paciente",
+    "Contato(s) Paciente",
+    "Nascimento",
+]
+
+# Columns an uploaded sheet must contain
+ESSENTIAL_COLUMNS = ["Nome da Sala", "Nome do Paciente", "Data/Hora Início"]
+
+# Patient-level subset of the DasaExp columns
+PATIENT_COLUMNS = [
+    "Nome do Paciente",
+    "Documento(s) Paciente",
+    "Contato(s) Paciente",
+    "Endereço Coleta",
+    "Nascimento",
+]
+
+DATETIME_FORMAT = "%d/%m/%Y %H:%M:%S"
+DATE_FORMAT = "%d/%m/%Y"
+
+CONFIRMATION_LABELS = {
+    "pending": "Não Confirmado",
+    "confirmed": "Confirmado",
+    "cancelled": "Cancelado",
+    "no_show": "Não Compareceu",
+}
+
+# 'Status Confirmação' label -> confirmation status; unknown labels read as pending
+CONFIRMATION_STATUSES = {label.lower(): status for status, label in CONFIRMATION_LABELS.items()}
+
+# Accepted date/time layouts, tried in order
+DATETIME_FORMATS = [
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%d/%m/%Y",
+    "%Y-%m-%d",
+]
+
+# 'ID Sala' prefix of exported appointments that were not imported from a sheet
+APPOINTMENT_ROOM_PREFIX = "APT-"
+
+# Default visit duration when 'Data/Hora Fim' is missing, in minutes
+DEFAULT_DURATION = 40
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Chunk size used when replaying a spooled export file
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Exports larger than this spill from memory to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def format_cpf(cpf: Optional[str]) -> str:
+    """Format a CPF as 'CPF: 000.000.000-00'"""
+    digits = "".join(ch for ch in cpf or "" if ch.isdigit())
+    if len(digits) != 11:
+        return ""
+    return f"CPF: {digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+def format_phone(contacts: List[Dict[str, Any]]) -> str:
+    """Format the primary mobile contact as 'Celular: 21 987654321'"""
+    mobiles = [c for c in contacts or [] if c.get("type") == "mobile"]
+    mobiles.sort(key=lambda c: not c.get("primary"))
+    if not mobiles:
+        return ""
+    digits = "".join(ch for ch in mobiles[0].get("value", "") if ch.isdigit())
+    return f"Celular: {digits[:2]} {digits[2:]}" if len(digits) >= 10 else ""
+
+
+def format_address(address: Optional[Dict[str, Any]]) -> str:
+    """Join address parts the way DasaExp lays them out"""
+    if not address:
+        return ""
+    parts = [address.get("street"), address.get("neighborhood"), address.get("city"), address.get("state")]
+    return ", ".join(part for part in parts if part)
+
+
+def appointment_row(
+    appointment: Dict[str, Any],
+    patient: Optional[Dict[str, Any]],
+    car_name: Optional[str]
+) -> List[Any]:
+    """Build a DasaExp row from raw appointment and patient documents"""
+    patient = patient or {}
+    personal_info = patient.get("personal_info", {})
+    confirmation = appointment.get("confirmation") or {}
+    exams = appointment.get("exams") or []
+
+    # A malformed stored slot leaves the times empty instead of breaking the stream
+    try:
+        start_minute = parse_time_slot(appointment.get("time_slot"))
+    except ValueError:
+        start = end = None
+    else:
+        start = appointment["scheduled_date"].replace(hour=0, minute=0, second=0, microsecond=0)
+        start += timedelta(minutes=start_minute)
+        end = start + timedelta(minutes=appointment.get("duration") or 0)
+    birth_date = personal_info.get("birth_date")
+
+    # Imported appointments keep their original 'ID Sala' so re-uploads match
+    room_id = (appointment.get("import_key") or "").split("|")[0]
+
+    return [
+        room_id or f"{APPOINTMENT_ROOM_PREFIX}{appointment['_id']}",
+        car_name or "",
+        start.strftime(DATETIME_FORMAT) if start else "",
+        end.strftime(DATETIME_FORMAT) if end else "",
+        personal_info.get("name", ""),
+        "",
+        ", ".join(exams),
+        len(exams),
+        format_address(patient.get("address")),
+        "",
+        "",
+        CONFIRMATION_LABELS.get(confirmation.get("status"), ""),
+        confirmation.get("method") or "",
+        format_cpf(personal_info.get("cpf")),
+        format_phone(patient.get("contacts")),
+        birth_date.strftime(DATE_FORMAT) if isinstance(birth_date, datetime) else "",
+    ]
+
+
+def patient_row(patient: Dict[str, Any]) -> List[Any]:
+    """Build a PATIENT_COLUMNS row from a raw patient document"""
+    personal_info = patient.get("personal_info", {})
+    birth_date = personal_info.get("birth_date")
+
+    return [
+        personal_info.get("name", ""),
+        format_cpf(personal_info.get("cpf")),
+        format_phone(patient.get("contacts")),
+        format_address(patient.get("address")),
+        birth_date.strftime(DATE_FORMAT) if isinstance(birth_date, datetime) else "",
+    ]
+
+
+async def stream_export(
+    batches: AsyncIterator[List[List[Any]]],
+    columns: List[str],
+    export_format: str
+) -> AsyncIterator[bytes]:
+    """
+    Encode batches of rows as CSV, XLSX or Parquet
+
+    CSV is written straight to the response one batch at a time. XLSX and
+    Parquet need a complete file, so rows are written incrementally into a
+    spooled temporary file that is then replayed in chunks.
+    """
+    if export_format == "csv":
+        async for chunk in _stream_csv(batches, columns):
+            yield chunk
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        if export_format == "xlsx":
+            await _write_xlsx(batches, columns, spool)
+        else:
+            await _write_parquet(batches, columns, spool)
+
+        spool.seek(0)
+        while chunk := spool.read(STREAM_CHUNK_SIZE):
+            yield chunk
+
+
+async def _stream_csv(batches: AsyncIterator[List[List[Any]]], columns: List[str]) -> AsyncIterator[bytes]:
+    """Yield one encoded CSV chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    async for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _write_xlsx(batches: AsyncIterator[List[List[Any]]], columns: List[str], spool) -> None:
+    """Write rows into a write-only openpyxl workbook"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Agenda")
+    sheet.append(columns)
+
+    async for rows in batches:
+        for row in rows:
+            sheet.append(row)
+
+    await run_in_threadpool(workbook.save, spool)
+
+
+async def _write_parquet(batches: AsyncIterator[List[List[Any]]], columns: List[str], spool) -> None:
+    """Write each batch as a Parquet row group"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    writer = pq.ParquetWriter(spool, schema, compression="zstd")
+    try:
+        async for rows in batches:
+            table = pa.Table.from_arrays(
+                [pa.array([str(row[i]) for row in rows], pa.string()) for i in range(len(columns))],
+                schema=schema
+            )
+            await run_in_threadpool(writer.write_table, table)
+    finally:
+        writer.close()
+
+
+def file_hash(contents: bytes) -> str:
+    """Content hash identifying an uploaded file"""
+    return hashlib.sha256(contents).hexdigest()
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """Parse a DasaExp date/time cell"""
+    text = str(value or "").strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_cpf(value: Any) -> Optional[str]:
+    """Extract CPF digits from 'Documento(s) Paciente'"""
+    match = re.search(r"CPF:\s*(\d{11}|\d{3}\.\d{3}\.\d{3}-\d{2})", str(value or ""))
+    return re.sub(r"\D", "", match.group(1)) if match else None
+
+
+def parse_phone(value: Any) -> Optional[str]:
+    """Extract the mobile number from 'Contato(s) Paciente'"""
+    match = re.search(r"Celular:\s*(\d{2})\s*(\d{8,9})", str(value or ""))
+    return match.group(1) + match.group(2) if match else None
+
+
+def parse_address(value: Any) -> Dict[str, str]:
+    """Split 'Endereço Coleta' into street, neighborhood and city"""
+    parts = [part.strip().title() for part in str(value or "").split(",") if part.strip()]
+    if parts and len(parts[-1]) == 2:
+        parts = parts[:-1]  # Trailing state abbreviation
+    if len(parts) >= 4:
+        return {"street": ", ".join(parts[:-2]), "neighborhood": parts[-2], "city": parts[-1]}
+    if len(parts) == 3:
+        return {"street": parts[0], "neighborhood": parts[1], "city": parts[2]}
+    return {"street": ", ".join(parts), "neighborhood": "", "city": "Rio De Janeiro"}
+
+
+def parse_schedule_rows(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Turn raw DasaExp rows into normalized schedule records
+
+    Each record carries a natural key ('ID Sala' + 'Data/Hora Início' +
+    patient CPF) and a hash of its content, so a re-upload can be diffed
+    against what was imported before. Later rows win on duplicate keys.
+    """
+    if rows:
+        missing = [column for column in ESSENTIAL_COLUMNS if column not in rows[0]]
+        if missing:
+            raise ValueError(f"Colunas obrigatórias não encontradas: {', '.join(missing)}")
+
+    records = {}
+    errors = []
+    for index, row in enumerate(rows, start=1):
+        car_match = re.search(r"CARRO\s+(\d+)", str(row.get("Nome da Sala") or ""), re.IGNORECASE)
+        patient_name = str(row.get("Nome do Paciente") or "").strip()
+        start = parse_datetime(row.get("Data/Hora Início"))
+        cpf = parse_cpf(row.get("Documento(s) Paciente"))
+
+        if not car_match:
+            errors.append(f"Row {index}: car not found in '{row.get('Nome da Sala')}'")
+            continue
+        if not patient_name or not start:
+            errors.append(f"Row {index}: missing patient name or start time")
+            continue
+        if not cpf:
+            errors.append(f"Row {index}: missing patient CPF")
+            continue
+
+        end = parse_datetime(row.get("Data/Hora Fim"))
+        duration = int((end - start).total_seconds() // 60) if end and end > start else DEFAULT_DURATION
+        exams = [exam.strip() for exam in str(row.get("Nomes dos Exames") or "").split(",") if exam.strip()]
+        confirmation_status = CONFIRMATION_STATUSES.get(
+            str(row.get("Status Confirmação") or "").strip().lower(), "pending"
+        )
+
+        record = {
+            "row": index,
+            "car_name": f"CARRO {car_match.group(1)}",
+            "scheduled_date": start.replace(hour=0, minute=0, second=0, microsecond=0),
+            "time_slot": start.strftime("%H:%M"),
+            "duration": min(max(duration, 15), 120),
+            "exams": exams,
+            "confirmation_status": confirmation_status,
+            "confirmation_method": str(row.get("Canal Confirmação") or "").strip() or None,
+            "patient": {
+                "name": patient_name,
+                "cpf": cpf,
+                "phone": parse_phone(row.get("Contato(s) Paciente")),
+                "birth_date": parse_datetime(row.get("Nascimento")),
+                "address": parse_address(row.get("Endereço Coleta")),
+            },
+        }
+        room_id = str(row.get("ID Sala") or "").strip()
+        if room_id.startswith(APPOINTMENT_ROOM_PREFIX):
+            record["appointment_id"] = room_id[len(APPOINTMENT_ROOM_PREFIX):]
+        record["import_key"] = "|".join([room_id, start.isoformat(), cpf])
+        record["import_hash"] = hashlib.sha1(repr([
+            record["car_name"], record["time_slot"], record["duration"], exams,
+            record["confirmation_status"], record["confirmation_method"]
+        ]).encode("utf-8")).hexdigest()
+
+        if record["import_key"] in records:
+            errors.append(f"Row {index}: duplicates row {records[record['import_key']]['row']}, keeping the latest")
+        records[record["import_key"]] = record
+
+    return list(records.values()), errors
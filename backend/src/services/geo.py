@@ -0,0 +1,195 @@
+"""
+Zone lookup and geocoding helpers
+
+Zone polygons live in MongoDB but are matched in memory: a uniform grid
+maps each cell to the zones whose bounding box touches it, so locating a
+point only runs the point-in-polygon test against a handful of candidates.
+"""
+import asyncio
+import re
+import time
+import unicodedata
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from src.core.config import settings
+from src.models.zone import GeocodeCache, Zone
+
+if TYPE_CHECKING:
+    import httpx
+
+# Mean Earth radius used to convert km into radians
+EARTH_RADIUS_KM = 6378.1
+
+Point = Tuple[float, float]
+
+
+class ZoneIndex:
+    """Grid-bucketed point-in-polygon index over zone boundaries"""
+
+    def __init__(self, zones: Iterable[Dict[str, Any]], cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[Tuple[str, List[List[List[Point]]]]]] = {}
+
+        for zone in zones:
+            polygons = _polygons(zone["geometry"])
+            if not polygons:
+                continue
+            lons = [lon for polygon in polygons for lon, _ in polygon[0]]
+            lats = [lat for polygon in polygons for _, lat in polygon[0]]
+            entry = (zone["name"], polygons)
+            for x in range(self._cell(min(lons)), self._cell(max(lons)) + 1):
+                for y in range(self._cell(min(lats)), self._cell(max(lats)) + 1):
+                    self.cells.setdefault((x, y), []).append(entry)
+
+    def _cell(self, value: float) -> int:
+        return int(value // self.cell_size)
+
+    def locate(self, coordinates: Optional[List[float]]) -> Optional[str]:
+        """Return the name of the zone containing [longitude, latitude]"""
+        if not coordinates or len(coordinates) != 2:
+            return None
+        lon, lat = coordinates
+        for name, polygons in self.cells.get((self._cell(lon), self._cell(lat)), []):
+            if any(_in_polygon(lon, lat, polygon) for polygon in polygons):
+                return name
+        return None
+
+
+_zone_index: Optional[ZoneIndex] = None
+_zone_index_loaded_at = 0.0
+_zone_index_lock = asyncio.Lock()
+
+
+async def get_zone_index() -> ZoneIndex:
+    """Return the cached zone index, reloading it once the TTL expires"""
+    global _zone_index, _zone_index_loaded_at
+
+    if _zone_index is not None and time.monotonic() - _zone_index_loaded_at < settings.ZONE_INDEX_TTL:
+        return _zone_index
+
+    async with _zone_index_lock:
+        if _zone_index is None or time.monotonic() - _zone_index_loaded_at >= settings.ZONE_INDEX_TTL:
+            zones = await Zone.get_motor_collection().find(
+                {"active": True}, projection={"name": 1, "geometry": 1}
+            ).to_list(length=None)
+            _zone_index = ZoneIndex(zones, settings.ZONE_GRID_SIZE)
+            _zone_index_loaded_at = time.monotonic()
+    return _zone_index
+
+
+def invalidate_zone_index() -> None:
+    """Force the next lookup to reload zones from MongoDB"""
+    global _zone_index
+    _zone_index = None
+
+
+def km_to_radians(km: float) -> float:
+    """Convert a distance in km into radians for $centerSphere"""
+    return km / EARTH_RADIUS_KM
+
+
+def address_key(address: Dict[str, Any]) -> str:
+    """Normalize an address into a geocode cache key"""
+    text = ", ".join(
+        str(address.get(part) or "") for part in ("street", "neighborhood", "city", "state")
+    )
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", text.lower()).strip(" ,")
+
+
+async def geocode_many(addresses: List[Dict[str, Any]]) -> Dict[str, Optional[List[float]]]:
+    """
+    Resolve addresses to coordinates, keyed by address_key
+
+    Cached results are read with a single query. Misses go to the configured
+    geocoder (if any), at most GEOCODER_CONCURRENCY at a time. Definite
+    answers are written back, including "no match", so the same address is
+    never looked up twice; failed lookups (network or HTTP errors) are not
+    cached and are retried on the next call.
+    """
+    keys = list({address_key(address): address for address in addresses}.items())
+    results = {
+        doc["address_key"]: doc.get("coordinates")
+        async for doc in GeocodeCache.get_motor_collection().find(
+            {"address_key": {"$in": [key for key, _ in keys]}},
+            projection={"address_key": 1, "coordinates": 1}
+        )
+    }
+
+    misses = [(key, address) for key, address in keys if key not in results]
+    if not misses or not settings.GEOCODER_URL:
+        return results
+
+    import httpx
+
+    semaphore = asyncio.Semaphore(settings.GEOCODER_CONCURRENCY)
+    resolved = []
+
+    async def lookup(client: "httpx.AsyncClient", key: str) -> None:
+        async with semaphore:
+            try:
+                results[key] = await _geocode(client, key)
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                results[key] = None
+                print(f"Geocoding failed for '{key}', will retry later: {e}")
+                return
+        resolved.append(key)
+
+    async with httpx.AsyncClient(timeout=10) as client:
+        await asyncio.gather(*(lookup(client, key) for key, _ in misses))
+
+    if resolved:
+        try:
+            await GeocodeCache.get_motor_collection().insert_many(
+                [
+                    {"address_key": key, "coordinates": results[key], "source": settings.GEOCODER_URL}
+                    for key in resolved
+                ],
+                ordered=False
+            )
+        except BulkWriteError:
+            pass  # Another worker cached some of these addresses first
+    return results
+
+
+async def _geocode(client: "httpx.AsyncClient", query: str) -> Optional[List[float]]:
+    """
+    Look up one address on a Nominatim-compatible endpoint
+
+    Returns None when the geocoder has no match; transport and HTTP errors
+    propagate so the caller does not mistake them for a negative answer.
+    """
+    response = await client.get(settings.GEOCODER_URL, params={"q": query, "format": "json", "limit": 1})
+    response.raise_for_status()
+    matches = response.json()
+    if not matches:
+        return None
+    return [float(matches[0]["lon"]), float(matches[0]["lat"])]
+
+
+def _polygons(geometry: Dict[str, Any]) -> List[List[List[Point]]]:
+    """Return the polygons of a GeoJSON geometry as lists of rings"""
+    if geometry.get("type") == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry.get("type") == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def _in_polygon(lon: float, lat: float, polygon: List[List[Point]]) -> bool:
+    """Ray-casting test against the outer ring, excluding holes"""
+    return _in_ring(lon, lat, polygon[0]) and not any(_in_ring(lon, lat, hole) for hole in polygon[1:])
+
+
+def _in_ring(lon: float, lat: float, ring: List[Point]) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
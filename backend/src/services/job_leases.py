@@ -0,0 +1,88 @@
+"""
+MongoDB-backed leases for jobs that must run in one worker at a time
+
+Each job has one document in `job_leases`, keyed by its name. Taking the
+lease is a single conditional upsert that only matches a free lease (never
+taken, released or expired) and, for scheduled runs, one whose last run
+started at least `min_interval` ago; every other worker's upsert then hits
+the _id index and fails. The holder renews the lease while it works, so
+the lease of a worker that died simply expires.
+"""
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from src.models.job_lease import JobLease
+
+
+async def acquire(name: str, seconds: int, min_interval: Optional[timedelta] = None) -> Optional[str]:
+    """Take the lease for `seconds`; returns its token, None when it is held or the job is not due"""
+    now = datetime.utcnow()
+    query = {"_id": name, "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]}
+    if min_interval:
+        query["$and"] = [{"$or": [{"started_at": None}, {"started_at": {"$lte": now - min_interval}}]}]
+
+    token = uuid.uuid4().hex
+    try:
+        await JobLease.get_motor_collection().update_one(
+            query,
+            {"$set": {"token": token, "locked_until": now + timedelta(seconds=seconds), "started_at": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    return token
+
+
+async def renew(name: str, token: str, seconds: int) -> bool:
+    """Extend a lease still held with `token`"""
+    result = await JobLease.get_motor_collection().update_one(
+        {"_id": name, "token": token},
+        {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=seconds)}}
+    )
+    return result.matched_count == 1
+
+
+async def release(name: str, token: str) -> None:
+    """Free a lease still held with `token`"""
+    await JobLease.get_motor_collection().update_one(
+        {"_id": name, "token": token},
+        {"$set": {"token": None, "locked_until": None, "finished_at": datetime.utcnow()}}
+    )
+
+
+async def is_held(name: str) -> bool:
+    """Whether any worker currently holds the lease"""
+    lease = await JobLease.get_motor_collection().find_one(
+        {"_id": name, "locked_until": {"$gt": datetime.utcnow()}},
+        projection={"_id": 1}
+    )
+    return lease is not None
+
+
+async def _keep_alive(name: str, token: str, seconds: int) -> None:
+    while True:
+        await asyncio.sleep(seconds / 3)
+        if not await renew(name, token, seconds):
+            print(f"Lost the {name} lease")
+            return
+
+
+@asynccontextmanager
+async def job_lease(name: str, seconds: int, min_interval: Optional[timedelta] = None) -> AsyncIterator[bool]:
+    """Hold the lease for the duration of the block; yields False when it could not be taken"""
+    token = await acquire(name, seconds, min_interval)
+    if token is None:
+        yield False
+        return
+
+    keep_alive = asyncio.create_task(_keep_alive(name, token, seconds))
+    try:
+        yield True
+    finally:
+        keep_alive.cancel()
+        await release(name, token)
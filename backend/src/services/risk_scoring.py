@@ -0,0 +1,298 @@
+"""
+Batched no-show risk scoring
+
+Appointment outcomes are grouped per patient inside MongoDB (both tiers),
+streamed back in chunks of RISK_SCORING_CHUNK_SIZE patients, turned into a
+feature matrix with pandas/NumPy and scored with a small logistic model.
+Each chunk is written back with a single bulk_write before the next one is
+read, so memory stays bounded by the chunk size, not the patient count.
+
+Passes run under a cluster-wide lease (see job_leases), so of all API
+workers only one runs the scheduled pass, and a manual or migrate run never
+overlaps it.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from src.core.config import settings
+from src.models.appointment import Appointment, time_slot_minutes_expression
+from src.models.patient import Patient
+from src.services.archive import with_archive
+from src.services.job_leases import is_held, job_lease
+
+# Slots starting before this minute of the day (08:00) count as early
+# morning (fasting exams, most no-shows)
+EARLY_MINUTE = 480
+
+# Lease name, and how often each worker checks whether a scheduled pass is due
+LEASE_NAME = "risk_scoring"
+SCHEDULE_CHECK_SECONDS = 600
+
+# Pseudo-appointments of neighborhood history blended into each patient's
+# own no-show rate, so one missed visit doesn't make a new patient high risk
+PRIOR_WEIGHT = 5.0
+
+# Logistic model weights over the feature columns built in _features()
+INTERCEPT = -2.4
+WEIGHTS = {
+    "no_show_rate": 4.0,
+    "reschedule_rate": 1.5,
+    "cancel_rate": 0.8,
+    "confirmation_rate": -1.5,
+    "lead_days": 0.35,  # log1p of average days booked in advance
+    "early_share": 0.5,
+    "neighborhood_excess": 3.0,  # neighborhood no-show rate above the overall rate
+}
+
+_task: Optional[asyncio.Task] = None
+
+
+def _outcome_counts() -> Dict[str, Any]:
+    """$group accumulators counting appointment outcomes"""
+    def count(status: str) -> Dict[str, Any]:
+        return {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+
+    return {
+        "appointments": {"$sum": 1},
+        "no_shows": count("no_show"),
+        "rescheduled": count("rescheduled"),
+        "cancelled": count("cancelled"),
+        "completed": count("completed"),
+    }
+
+
+def _history_pipeline(before: datetime) -> List[Dict[str, Any]]:
+    """Past appointments of every patient, one output document per patient"""
+    return with_archive({"scheduled_date": {"$lt": before}}, None) + [
+        {"$group": {
+            "_id": "$patient_id",
+            **_outcome_counts(),
+            "lead_hours": {"$avg": {"$divide": [
+                {"$subtract": [{"$ifNull": ["$start_at", "$scheduled_date"]}, "$created_at"]},
+                3600000
+            ]}},
+            # Appointments whose start can't be worked out are left out of the average
+            "early_share": {"$avg": {"$let": {
+                "vars": {"minute": {"$ifNull": ["$start_minute", time_slot_minutes_expression("$time_slot")]}},
+                "in": {"$cond": [
+                    {"$eq": ["$$minute", None]},
+                    None,
+                    {"$cond": [{"$lt": ["$$minute", EARLY_MINUTE]}, 1, 0]}
+                ]}
+            }}},
+            "last_collection_date": {"$max": {
+                "$cond": [{"$eq": ["$status", "completed"]}, "$scheduled_date", None]
+            }},
+        }},
+    ]
+
+
+async def neighborhood_rates(before: datetime) -> Dict[Optional[str], float]:
+    """
+    No-show rate per neighborhood, with the overall rate under the None key
+
+    Joins the per-patient counts to patients on the server, so only one row
+    per neighborhood comes back.
+    """
+    rows = await Appointment.aggregate(
+        with_archive({"scheduled_date": {"$lt": before}}, None) + [
+            {"$group": {"_id": "$patient_id", **_outcome_counts()}},
+            {"$addFields": {"patient_oid": {"$convert": {
+                "input": "$_id", "to": "objectId", "onError": None, "onNull": None
+            }}}},
+            {"$lookup": {
+                "from": Patient.get_collection_name(),
+                "localField": "patient_oid",
+                "foreignField": "_id",
+                "as": "patient",
+            }},
+            {"$group": {
+                "_id": {"$arrayElemAt": ["$patient.address.neighborhood", 0]},
+                "appointments": {"$sum": "$appointments"},
+                "no_shows": {"$sum": "$no_shows"},
+            }},
+        ],
+        allowDiskUse=True
+    ).to_list()
+
+    total = sum(row["appointments"] for row in rows)
+    overall = sum(row["no_shows"] for row in rows) / total if total else 0.0
+    rates = {row["_id"]: row["no_shows"] / row["appointments"] for row in rows if row["_id"] and row["appointments"]}
+    rates[None] = overall
+    return rates
+
+
+def _features(history: List[Dict[str, Any]], patients: Dict[str, Dict[str, Any]],
+              rates: Dict[Optional[str], float]):
+    """Feature matrix for one chunk, indexed by patient id"""
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame(history).set_index("_id")
+    frame = frame[frame.index.isin(list(patients))]
+    info = pd.DataFrame.from_dict(patients, orient="index").reindex(frame.index)
+
+    overall = rates[None]
+    neighborhood = info["neighborhood"].map(rates).astype(float).fillna(overall)
+
+    appointments = frame["appointments"].astype(float)
+    features = pd.DataFrame(index=frame.index)
+    # Own history shrunk toward the neighborhood rate
+    features["no_show_rate"] = (frame["no_shows"] + PRIOR_WEIGHT * neighborhood) / (appointments + PRIOR_WEIGHT)
+    features["reschedule_rate"] = frame["rescheduled"] / appointments
+    features["cancel_rate"] = frame["cancelled"] / appointments
+    features["confirmation_rate"] = info["confirmation_rate"].astype(float).fillna(0.0)
+    features["lead_days"] = np.log1p((frame["lead_hours"].astype(float).fillna(0.0) / 24).clip(lower=0))
+    features["early_share"] = frame["early_share"].astype(float).fillna(0.0)
+    features["neighborhood_excess"] = (neighborhood - overall).clip(lower=0)
+    return frame, features
+
+
+def score(features) -> Any:
+    """No-show probability for each row of a feature matrix"""
+    import numpy as np
+
+    columns = list(WEIGHTS)
+    logits = INTERCEPT + features[columns].to_numpy(dtype=float) @ np.array([WEIGHTS[c] for c in columns])
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def _updates(history: List[Dict[str, Any]], patients: Dict[str, Dict[str, Any]],
+             rates: Dict[Optional[str], float]) -> List[UpdateOne]:
+    """Score one chunk and build its writes (CPU-bound, run off the event loop)"""
+    import numpy as np
+    import pandas as pd
+
+    frame, features = _features(history, patients, rates)
+    if frame.empty:
+        return []
+
+    probability = score(features)
+    levels = np.select(
+        [probability >= settings.RISK_HIGH_THRESHOLD, probability >= settings.RISK_MEDIUM_THRESHOLD],
+        ["high", "medium"],
+        default="low"
+    )
+    no_show_rate = (frame["no_shows"] / frame["appointments"]).round(4)
+    reschedule_rate = features["reschedule_rate"].round(4)
+
+    writes = []
+    for i, patient_id in enumerate(frame.index):
+        last = frame["last_collection_date"].iloc[i]
+        writes.append(UpdateOne({"_id": ObjectId(patient_id)}, {"$set": {
+            "analytics.risk_score": str(levels[i]),
+            "analytics.no_show_rate": float(no_show_rate.iloc[i]),
+            "analytics.reschedule_rate": float(reschedule_rate.iloc[i]),
+            "analytics.total_collections": int(frame["completed"].iloc[i]),
+            "analytics.last_collection_date": None if pd.isna(last) else pd.Timestamp(last).to_pydatetime(),
+        }}))
+    return writes
+
+
+async def _score_chunk(history: List[Dict[str, Any]], rates: Dict[Optional[str], float]) -> int:
+    """Load the patient fields a chunk needs, score it and write it back"""
+    ids = [ObjectId(row["_id"]) for row in history if ObjectId.is_valid(row["_id"] or "")]
+    collection = Patient.get_motor_collection()
+    cursor = collection.find(
+        {"_id": {"$in": ids}},
+        projection={"confirmation_rate": 1, "address.neighborhood": 1}
+    )
+    patients = {
+        str(doc["_id"]): {
+            "confirmation_rate": doc.get("confirmation_rate", 0.0),
+            "neighborhood": doc.get("address", {}).get("neighborhood"),
+        }
+        async for doc in cursor
+    }
+    if not patients:
+        return 0
+
+    writes = await asyncio.to_thread(_updates, history, patients, rates)
+    if writes:
+        await collection.bulk_write(writes, ordered=False)
+    return len(writes)
+
+
+async def score_patients() -> Dict[str, Any]:
+    """
+    Recompute analytics.risk_score and the outcome rates of every patient with history
+
+    Only past appointments count. Patients without any keep their current values.
+    Callers take the lease first, see run_scoring_pass().
+    """
+    started = datetime.utcnow()
+    today = datetime.combine(date.today(), datetime.min.time())
+    rates = await neighborhood_rates(today)
+
+    chunk_size = settings.RISK_SCORING_CHUNK_SIZE
+    cursor = Appointment.get_motor_collection().aggregate(
+        _history_pipeline(today), allowDiskUse=True, batchSize=chunk_size
+    )
+
+    scored = 0
+    chunk = []
+    async for row in cursor:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            scored += await _score_chunk(chunk, rates)
+            chunk = []
+    if chunk:
+        scored += await _score_chunk(chunk, rates)
+
+    return {
+        "scored": scored,
+        "overall_no_show_rate": round(rates[None], 4),
+        "seconds": round((datetime.utcnow() - started).total_seconds(), 1),
+    }
+
+
+async def run_scoring_pass(min_interval: Optional[timedelta] = None) -> Optional[Dict[str, Any]]:
+    """
+    score_patients() under the lease
+
+    Returns None without scoring when another pass holds the lease or, with
+    `min_interval`, when the last pass started more recently than that.
+    """
+    async with job_lease(LEASE_NAME, settings.RISK_SCORING_LEASE_SECONDS, min_interval) as acquired:
+        if not acquired:
+            return None
+        return await score_patients()
+
+
+async def scoring_in_progress() -> bool:
+    """Whether a scoring pass is running in any worker"""
+    return await is_held(LEASE_NAME)
+
+
+async def _score_and_report(min_interval: Optional[timedelta] = None):
+    try:
+        result = await run_scoring_pass(min_interval)
+        if result:
+            print(f"Scored {result['scored']} patients in {result['seconds']}s")
+        elif min_interval is None:
+            print("Risk scoring skipped: another pass is running")
+    except Exception as e:
+        print(f"Risk scoring failed: {e}")
+
+
+def start_scoring() -> None:
+    """Start a scoring pass in the background"""
+    global _task
+    _task = asyncio.create_task(_score_and_report())
+
+
+async def run_risk_scoring():
+    """
+    Rescore patients every RISK_SCORING_INTERVAL_HOURS
+
+    Every worker checks periodically; the lease lets the first one to find
+    a pass due run it and makes the others skip.
+    """
+    interval = timedelta(hours=settings.RISK_SCORING_INTERVAL_HOURS)
+    while True:
+        await asyncio.sleep(SCHEDULE_CHECK_SECONDS)
+        await _score_and_report(interval)
@@ -0,0 +1,259 @@
+"""
+Idempotent import of DasaExp schedule spreadsheets
+
+Each upload is identified by a content hash and each row by a natural key
+('ID Sala' + 'Data/Hora Início' + patient CPF). The rows are diffed against
+the appointments previously imported for the same days and only the delta
+is written, in a single bulk_write.
+"""
+import io
+from datetime import datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from src.models.appointment import Appointment, Confirmation, schedule_fields
+from src.models.patient import Patient, PersonalInfo, Contact, Address
+from src.models.schedule_import import ScheduleImport
+from src.services.file_processor import file_hash, parse_schedule_rows
+from src.services.car_registry import car_registry
+from src.services.geo import address_key, geocode_many, get_zone_index
+
+# Confirmation outcomes that mean the visit will not happen
+INACTIVE_CONFIRMATIONS = ("cancelled", "no_show")
+
+
+async def import_schedule(contents: bytes, filename: str) -> Dict[str, Any]:
+    """Import a schedule file, applying only what changed since the last upload"""
+    digest = file_hash(contents)
+    summary = {
+        "filename": filename,
+        "file_hash": digest,
+        "duplicate": False,
+        "total_rows": 0,
+        "processed": 0,
+        "inserted": 0,
+        "updated": 0,
+        "removed": 0,
+        "unchanged": 0,
+        "errors": [],
+    }
+
+    # Byte-identical re-upload of the latest file for its days: nothing to do.
+    # An older file (A, then B, then A again) goes through the row diff.
+    previous = await ScheduleImport.find_one({"file_hash": digest})
+    latest = None
+    if previous and previous.dates:
+        latest = await ScheduleImport.find({"dates": {"$in": previous.dates}}).sort("-created_at").first_or_none()
+    if previous and latest and latest.file_hash == digest:
+        summary.update({
+            "duplicate": True,
+            "total_rows": previous.total_rows,
+            "unchanged": previous.total_rows,
+            "imported_at": previous.created_at,
+        })
+        return summary
+
+    rows = _read_rows(contents, filename)
+    summary["total_rows"] = len(rows)
+    records, errors = parse_schedule_rows(rows)
+    summary["errors"] = errors
+
+    records = await _resolve_cars(records, errors)
+    records = await _resolve_patients(records, errors)
+
+    # Previously imported appointments for the days in this file
+    days = sorted({record["scheduled_date"] for record in records})
+    collection = Appointment.get_motor_collection()
+    existing = {}
+    if days:
+        cursor = collection.find(
+            {"scheduled_date": {"$in": days}, "import_key": {"$ne": None}},
+            projection={"import_key": 1, "import_hash": 1}
+        )
+        existing = {doc["import_key"]: doc async for doc in cursor}
+
+    # Rows exported from appointments booked in the app ('APT-<id>') match by id
+    exported_ids = [ObjectId(r["appointment_id"]) for r in records if ObjectId.is_valid(r.get("appointment_id") or "")]
+    exported = {}
+    if exported_ids:
+        cursor = collection.find({"_id": {"$in": exported_ids}}, projection={"import_key": 1, "import_hash": 1})
+        exported = {str(doc["_id"]): doc async for doc in cursor}
+
+    # Diff against what is stored
+    now = datetime.utcnow()
+    writes = []
+    for record in records:
+        current = exported.get(record.get("appointment_id"))
+        if current is not None:
+            existing.pop(current.get("import_key"), None)
+        else:
+            current = existing.pop(record["import_key"], None)
+
+        if current is None:
+            writes.append(InsertOne(_new_appointment(record)))
+            summary["inserted"] += 1
+        elif current.get("import_hash") != record["import_hash"] or current.get("import_key") != record["import_key"]:
+            fields = {
+                "car_id": record["car_id"],
+                "scheduled_date": record["scheduled_date"],
+                "time_slot": record["time_slot"],
+                "duration": record["duration"],
+                "exams": record["exams"],
+                "confirmation.status": record["confirmation_status"],
+                "confirmation.method": record["confirmation_method"],
+                "import_key": record["import_key"],
+                "import_hash": record["import_hash"],
+                "updated_at": now,
+                **schedule_fields(record["scheduled_date"], record["time_slot"], record["duration"]),
+            }
+            # Rows removed by an earlier import come back as scheduled, unless
+            # the sheet itself marks them cancelled or missed
+            if (
+                current.get("import_key") and current.get("import_hash") is None
+                and record["confirmation_status"] not in INACTIVE_CONFIRMATIONS
+            ):
+                fields["status"] = "scheduled"
+            writes.append(UpdateOne({"_id": current["_id"]}, {"$set": fields, "$inc": {"version": 1}}))
+            summary["updated"] += 1
+        else:
+            summary["unchanged"] += 1
+
+    # Whatever is left was dropped from the sheet
+    for current in existing.values():
+        if current.get("import_hash") is None:
+            continue
+        writes.append(UpdateOne(
+            {"_id": current["_id"]},
+            {"$set": {"status": "cancelled", "import_hash": None, "updated_at": now}, "$inc": {"version": 1}}
+        ))
+        summary["removed"] += 1
+
+    if writes:
+        await collection.bulk_write(writes, ordered=False)
+
+    summary["processed"] = summary["inserted"] + summary["updated"] + summary["unchanged"]
+
+    # Upsert so a re-applied older file becomes the latest import for its days
+    record = ScheduleImport(
+        file_hash=digest,
+        filename=filename,
+        dates=days,
+        total_rows=summary["total_rows"],
+        inserted=summary["inserted"],
+        updated=summary["updated"],
+        removed=summary["removed"],
+        unchanged=summary["unchanged"],
+    )
+    try:
+        await ScheduleImport.get_motor_collection().update_one(
+            {"file_hash": digest},
+            {"$set": record.model_dump(exclude={"id", "revision_id", "file_hash"})},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # A concurrent upload of the same file already recorded it
+
+    return summary
+
+
+def _read_rows(contents: bytes, filename: str) -> List[Dict[str, Any]]:
+    """Read the sheet as string cells"""
+    # pandas (and NumPy) are only needed here, so keep them out of worker startup
+    import pandas as pd
+
+    if filename.endswith(".csv"):
+        df = pd.read_csv(io.BytesIO(contents), dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(io.BytesIO(contents), dtype=str, keep_default_na=False)
+    return df.to_dict("records")
+
+
+async def _resolve_cars(records: List[Dict[str, Any]], errors: List[str]) -> List[Dict[str, Any]]:
+    """Map 'CARRO N' names to car ids, dropping rows for unknown cars"""
+    resolved = []
+    for record in records:
+        car = await car_registry.get_by_name(record["car_name"])
+        if not car:
+            errors.append(f"Row {record['row']}: car '{record['car_name']}' is not registered")
+            continue
+        record["car_id"] = str(car.id)
+        resolved.append(record)
+    return resolved
+
+
+async def _resolve_patients(records: List[Dict[str, Any]], errors: List[str]) -> List[Dict[str, Any]]:
+    """Map CPFs to patient ids, creating the patients seen for the first time"""
+    cpfs = list({record["patient"]["cpf"] for record in records})
+    patient_ids = {
+        doc["personal_info"]["cpf"]: str(doc["_id"])
+        async for doc in Patient.get_motor_collection().find(
+            {"personal_info.cpf": {"$in": cpfs}},
+            projection={"personal_info.cpf": 1}
+        )
+    }
+
+    new_patients = {}
+    for record in records:
+        info = record["patient"]
+        if info["cpf"] in patient_ids or info["cpf"] in new_patients:
+            continue
+        try:
+            new_patients[info["cpf"]] = _new_patient(info)
+        except ValidationError as e:
+            errors.append(f"Row {record['row']}: invalid patient data ({e.error_count()} errors)")
+
+    if new_patients:
+        await _locate_patients(list(new_patients.values()))
+        result = await Patient.insert_many(list(new_patients.values()))
+        for cpf, inserted_id in zip(new_patients, result.inserted_ids):
+            patient_ids[cpf] = str(inserted_id)
+
+    resolved = []
+    for record in records:
+        patient_id = patient_ids.get(record["patient"]["cpf"])
+        if patient_id:
+            record["patient_id"] = patient_id
+            resolved.append(record)
+    return resolved
+
+
+async def _locate_patients(patients: List[Patient]) -> None:
+    """Fill coordinates from the geocode cache and assign service zones"""
+    coordinates = await geocode_many([patient.address.model_dump() for patient in patients])
+    zone_index = await get_zone_index()
+    for patient in patients:
+        patient.address.coordinates = coordinates.get(address_key(patient.address.model_dump()))
+        patient.address.zone = zone_index.locate(patient.address.coordinates)
+
+
+def _new_patient(info: Dict[str, Any]) -> Patient:
+    """Build a patient from the columns available in the sheet"""
+    return Patient(
+        personal_info=PersonalInfo(name=info["name"], cpf=info["cpf"], birth_date=info["birth_date"]),
+        contacts=[Contact(type="mobile", value=info["phone"], primary=True)] if info["phone"] else [],
+        address=Address(**info["address"]),
+        tags=["imported"],
+    )
+
+
+def _new_appointment(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the raw document for an imported appointment"""
+    appointment = Appointment(
+        patient_id=record["patient_id"],
+        car_id=record["car_id"],
+        scheduled_date=record["scheduled_date"],
+        time_slot=record["time_slot"],
+        duration=record["duration"],
+        exams=record["exams"],
+        confirmation=Confirmation(
+            status=record["confirmation_status"],
+            method=record["confirmation_method"],
+        ),
+        import_key=record["import_key"],
+        import_hash=record["import_hash"],
+    )
+    return appointment.model_dump(exclude={"id", "revision_id"})
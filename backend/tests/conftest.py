@@ -0,0 +1,101 @@
+"""
+Shared fixtures
+
+Tests run against a real MongoDB (TEST_MONGODB_URL, falling back to
+MONGODB_URL) in a throwaway database, and are skipped when none is reachable.
+"""
+import os
+from datetime import datetime
+from typing import List
+
+import pytest
+import pytest_asyncio
+from beanie import init_beanie
+from httpx import ASGITransport, AsyncClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.errors import ServerSelectionTimeoutError
+
+from src.core.config import settings
+from src.db.mongodb import DOCUMENT_MODELS
+from src.main import app
+
+TEST_DB_NAME = f"{settings.MONGODB_DB_NAME}_test"
+
+# Commands that touch documents; handshakes and session cleanup are ignored
+DATA_COMMANDS = {"find", "findAndModify", "insert", "update", "delete", "aggregate", "count", "getMore"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Records the data commands sent to MongoDB"""
+
+    def __init__(self):
+        self.commands: List[str] = []
+
+    def started(self, event):
+        if event.command_name in DATA_COMMANDS:
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.commands.clear()
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Beanie bound to an empty test database; yields the command counter"""
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(
+        os.environ.get("TEST_MONGODB_URL", settings.MONGODB_URL),
+        event_listeners=[counter],
+        serverSelectionTimeoutMS=2000
+    )
+    try:
+        await client.admin.command("ping")
+    except ServerSelectionTimeoutError:
+        client.close()
+        pytest.skip("MongoDB is not reachable")
+
+    await client.drop_database(TEST_DB_NAME)
+    await init_beanie(database=client[TEST_DB_NAME], document_models=DOCUMENT_MODELS)
+    counter.reset()
+    yield counter
+    await client.drop_database(TEST_DB_NAME)
+    client.close()
+
+
+@pytest_asyncio.fixture
+async def api():
+    """HTTP client calling the app in-process (lifespan not started)"""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def patient_doc(cpf: str = "12345678901", **fields) -> dict:
+    """Raw patient document as stored before versioning existed"""
+    return {
+        "personal_info": {"name": "Ana Costa Silva", "cpf": cpf, "birth_date": datetime(1985, 3, 15)},
+        "contacts": [{"type": "mobile", "value": "21987654321", "primary": True}],
+        "address": {"street": "Rua das Palmeiras, 230", "neighborhood": "Recreio", "city": "Rio de Janeiro"},
+        "status": "active",
+        **fields
+    }
+
+
+def appointment_doc(**fields) -> dict:
+    """Raw appointment document as stored before versioning existed"""
+    return {
+        "patient_id": "507f1f77bcf86cd799439011",
+        "car_id": "507f1f77bcf86cd799439012",
+        "scheduled_date": datetime(2030, 1, 10),
+        "time_slot": "08:00",
+        "duration": 30,
+        "status": "scheduled",
+        "confirmation": {"status": "pending", "attempts": 0},
+        **fields
+    }
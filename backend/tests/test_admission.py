@@ -0,0 +1,94 @@
+"""
+Admission control routing and client identity
+"""
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.core import admission
+from src.core.config import settings
+from src.services.archive import archive_boundary
+
+
+def _scope(peer: str, forwarded: str = None, user=None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    scope = {"type": "http", "client": (peer, 50000), "headers": headers}
+    if user is not None:
+        scope["user"] = user
+    return scope
+
+
+@pytest.mark.parametrize("path, group", [
+    ("/api/analytics/schedule", "analytics"),
+    ("/api/analytics/dashboard", None),
+    ("/api/schedule/calendar", None),
+    ("/api/schedule/upload", "upload"),
+    ("/api/patients/export", "export"),
+])
+def test_route_group(path, group):
+    assert admission.route_group(path) == group
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.1"])
+
+    assert admission.client_identity(_scope("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_forwarded_for_names_the_client_behind_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.0/8"])
+
+    scope = _scope("10.0.0.1", "198.51.100.1, 192.0.2.9, 10.0.0.2")
+
+    # The left-most hop can be forged by the client; the last untrusted one cannot
+    assert admission.client_identity(scope) == "192.0.2.9"
+
+
+def test_clients_behind_one_proxy_get_separate_buckets(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.1"])
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"export": 60})
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 1)
+    limiter = admission.RateLimiter()
+
+    first = admission.client_identity(_scope("10.0.0.1", "192.0.2.1"))
+    second = admission.client_identity(_scope("10.0.0.1", "192.0.2.2"))
+
+    assert limiter.take("export", first) == 0
+    assert limiter.take("export", second) == 0
+    assert limiter.take("export", first) > 0
+
+
+def test_authenticated_user_is_preferred(monkeypatch):
+    class User:
+        is_authenticated = True
+        display_name = "ana"
+
+    assert admission.client_identity(_scope("10.0.0.1", user=User())) == "user:ana"
+
+
+@pytest.mark.parametrize("date_from, date_to", [
+    (date(2000, 1, 1), None),
+    (None, date(2000, 1, 1)),
+    (date(2030, 1, 10), date(2030, 1, 9)),
+    (date(2030, 1, 1), date(2031, 1, 1)),
+])
+def test_date_ranges_that_are_rejected(monkeypatch, date_from, date_to):
+    monkeypatch.setattr(settings, "MAX_DATE_RANGE_DAYS", 92)
+
+    with pytest.raises(HTTPException) as error:
+        admission.ensure_date_range(date_from, date_to)
+
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("date_from, date_to", [
+    (None, None),
+    (date.today() - timedelta(days=10), None),
+    (None, archive_boundary().date()),
+    (date(2000, 1, 1), date(2000, 1, 31)),
+])
+def test_date_ranges_that_are_accepted(monkeypatch, date_from, date_to):
+    monkeypatch.setattr(settings, "MAX_DATE_RANGE_DAYS", 92)
+
+    admission.ensure_date_range(date_from, date_to)
@@ -0,0 +1,58 @@
+"""
+Moving old appointments to the archive
+"""
+from datetime import timedelta
+
+import pytest
+
+from src.models.appointment import Appointment, ArchivedAppointment
+from src.services import archive
+from src.services.job_leases import job_lease
+from tests.conftest import appointment_doc
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_archive_moves_old_appointments(db):
+    old = archive.archive_boundary() - timedelta(days=1)
+    await Appointment.get_motor_collection().insert_many([
+        appointment_doc(scheduled_date=old, version=0),
+        appointment_doc()
+    ])
+
+    assert await archive.run_archive_pass() == 1
+    assert await Appointment.get_motor_collection().count_documents({}) == 1
+    assert await ArchivedAppointment.get_motor_collection().count_documents({}) == 1
+
+
+async def test_archive_skips_while_another_run_holds_the_lease(db):
+    old = archive.archive_boundary() - timedelta(days=1)
+    await Appointment.get_motor_collection().insert_one(appointment_doc(scheduled_date=old))
+
+    async with job_lease(archive.LEASE_NAME, 60) as acquired:
+        assert acquired
+        assert await archive.run_archive_pass() is None
+
+    assert await Appointment.get_motor_collection().count_documents({}) == 1
+
+
+async def test_archive_keeps_appointments_updated_after_the_copy(db, monkeypatch):
+    old = archive.archive_boundary() - timedelta(days=1)
+    hot = Appointment.get_motor_collection()
+    result = await hot.insert_one(appointment_doc(scheduled_date=old, version=0))
+    cold = ArchivedAppointment.get_motor_collection()
+    bulk_write = cold.bulk_write
+
+    async def copy_then_update(requests, **kwargs):
+        outcome = await bulk_write(requests, **kwargs)
+        await hot.update_one({"_id": result.inserted_id}, {"$set": {"status": "completed"}, "$inc": {"version": 1}})
+        return outcome
+
+    monkeypatch.setattr(cold, "bulk_write", copy_then_update)
+    assert await archive.archive_appointments() == 0
+    monkeypatch.undo()
+
+    # The next run copies the updated document over the stale copy
+    assert await archive.archive_appointments() == 1
+    stored = await cold.find_one({"_id": result.inserted_id})
+    assert stored["status"] == "completed"
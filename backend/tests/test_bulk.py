@@ -0,0 +1,37 @@
+"""
+Bulk appointment operations
+"""
+import pytest
+
+from src.models.appointment import Appointment
+from tests.conftest import appointment_doc
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_bulk_applies_to_unversioned_documents(db, api):
+    collection = Appointment.get_motor_collection()
+    result = await collection.insert_many([appointment_doc(), appointment_doc(time_slot="09:00")])
+    ids = [str(i) for i in result.inserted_ids]
+
+    response = await api.post("/api/schedule/bulk", json={"operations": [
+        {"appointment_id": ids[0], "action": "confirm", "confirmed_by": "ana"},
+        {"appointment_id": ids[1], "action": "cancel", "expected_version": 0},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 2
+    stored = {str(doc["_id"]): doc async for doc in collection.find()}
+    assert stored[ids[0]]["confirmation"]["status"] == "confirmed"
+    assert stored[ids[1]]["status"] == "cancelled"
+    assert all(doc["version"] == 1 for doc in stored.values())
+
+
+async def test_bulk_rejects_stale_expected_version(db, api):
+    result = await Appointment.get_motor_collection().insert_one(appointment_doc(version=2))
+
+    response = await api.post("/api/schedule/bulk", json={"operations": [
+        {"appointment_id": str(result.inserted_id), "action": "confirm", "expected_version": 1},
+    ]})
+
+    assert response.json()["results"][0]["error"] == "Appointment was modified by another request"
@@ -0,0 +1,61 @@
+"""
+Car change stream recovery
+"""
+from typing import List
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from src.models.car import Car
+from src.services import car_registry as registry_module
+
+pytestmark = pytest.mark.asyncio
+
+
+class FailingCollection:
+    """Collection whose watch() raises the queued errors in order"""
+
+    def __init__(self, errors: List[Exception]):
+        self.errors = errors
+        self.attempts = 0
+
+    def watch(self):
+        self.attempts += 1
+        raise self.errors.pop(0)
+
+
+async def test_watch_retries_transient_errors_with_backoff(monkeypatch):
+    collection = FailingCollection([
+        AutoReconnect("primary stepped down"),
+        AutoReconnect("no primary"),
+        OperationFailure("only supported on replica sets", code=registry_module.CHANGE_STREAMS_UNSUPPORTED),
+    ])
+    delays = []
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(Car, "get_motor_collection", classmethod(lambda cls: collection))
+    monkeypatch.setattr(registry_module.asyncio, "sleep", sleep)
+
+    await registry_module.watch_cars()
+
+    assert collection.attempts == 3
+    assert delays == [1, 2]
+
+
+async def test_watch_retries_other_operation_failures(monkeypatch):
+    collection = FailingCollection([
+        OperationFailure("interrupted at shutdown", code=11600),
+        OperationFailure("only supported on replica sets", code=registry_module.CHANGE_STREAMS_UNSUPPORTED),
+    ])
+
+    async def sleep(seconds):
+        pass
+
+    monkeypatch.setattr(Car, "get_motor_collection", classmethod(lambda cls: collection))
+    monkeypatch.setattr(registry_module.asyncio, "sleep", sleep)
+
+    await registry_module.watch_cars()
+
+    assert collection.attempts == 2
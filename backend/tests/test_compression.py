@@ -0,0 +1,42 @@
+"""
+Response compression
+"""
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import JSONResponse
+
+from src.core.compression import CompressionMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_shared_response_is_compressed_identically_each_time():
+    # Coalesced routes used to hand the same Response object to every waiter
+    shared = JSONResponse({"rows": ["x" * 100] * 50})
+
+    async def app(scope, receive, send):
+        await shared(scope, receive, send)
+
+    transport = ASGITransport(app=CompressionMiddleware(app, ["gzip"], minimum_size=100))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/", headers={"Accept-Encoding": "gzip"})
+        second = await client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    for response in (first, second):
+        assert response.headers.get_list("content-encoding") == ["gzip"]
+        assert response.headers.get_list("vary") == ["Accept-Encoding"]
+        assert response.json() == {"rows": ["x" * 100] * 50}
+    assert "content-encoding" not in shared.headers
+    assert shared.headers["content-length"] == str(len(shared.body))
+
+
+async def test_small_bodies_pass_through():
+    async def app(scope, receive, send):
+        await JSONResponse({"ok": True})(scope, receive, send)
+
+    transport = ASGITransport(app=CompressionMiddleware(app, ["gzip"], minimum_size=1024))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
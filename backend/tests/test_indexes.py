@@ -0,0 +1,45 @@
+"""
+Natural keys are backed by unique indexes in every index mode
+"""
+import pytest
+
+from src.db.mongodb import DOCUMENT_MODELS, DeferredIndexInitializer
+from src.models.car import Car
+from src.models.outbound_message import OutboundMessage
+from src.models.patient import Patient
+from src.models.schedule_import import ScheduleImport
+from src.models.zone import GeocodeCache, Zone
+
+pytestmark = pytest.mark.asyncio
+
+UNIQUE_KEYS = [
+    (Patient, "personal_info.cpf"),
+    (Car, "name"),
+    (ScheduleImport, "file_hash"),
+    (Zone, "name"),
+    (GeocodeCache, "address_key"),
+    (OutboundMessage, "dedupe_key"),
+]
+
+
+async def _assert_unique(model, field: str):
+    indexes = await model.get_motor_collection().index_information()
+    matching = [index for index in indexes.values() if index["key"] == [(field, 1)]]
+    assert len(matching) == 1, f"{model.__name__}.{field}: {indexes}"
+    assert matching[0].get("unique"), f"{model.__name__}.{field} is not unique"
+
+
+@pytest.mark.parametrize("model, field", UNIQUE_KEYS)
+async def test_unique_indexes_on_startup(db, model, field):
+    await _assert_unique(model, field)
+
+
+@pytest.mark.parametrize("model, field", UNIQUE_KEYS)
+async def test_unique_indexes_with_deferred_index_modes(db, model, field):
+    database = model.get_motor_collection().database
+    for collection in await database.list_collection_names():
+        await database[collection].drop_indexes()
+
+    await DeferredIndexInitializer(database=database, document_models=DOCUMENT_MODELS)
+
+    await _assert_unique(model, field)
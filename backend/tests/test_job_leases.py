@@ -0,0 +1,45 @@
+"""
+Cluster-wide job leases
+"""
+from datetime import timedelta
+
+import pytest
+
+from src.services import job_leases
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_only_one_holder_at_a_time(db):
+    first = await job_leases.acquire("job", 60)
+    second = await job_leases.acquire("job", 60)
+
+    assert first is not None
+    assert second is None
+    assert await job_leases.is_held("job")
+
+
+async def test_released_lease_can_be_taken_again(db):
+    token = await job_leases.acquire("job", 60)
+    await job_leases.release("job", token)
+
+    assert not await job_leases.is_held("job")
+    assert await job_leases.acquire("job", 60) is not None
+
+
+async def test_expired_lease_can_be_taken_over(db):
+    stale = await job_leases.acquire("job", -1)
+
+    assert await job_leases.acquire("job", 60) is not None
+    assert not await job_leases.renew("job", stale, 60)
+
+
+async def test_min_interval_skips_a_job_that_ran_recently(db):
+    async with job_leases.job_lease("job", 60) as acquired:
+        assert acquired
+
+    async with job_leases.job_lease("job", 60, min_interval=timedelta(hours=24)) as acquired:
+        assert not acquired
+
+    async with job_leases.job_lease("job", 60) as acquired:
+        assert acquired
@@ -0,0 +1,71 @@
+"""
+Appointment listing across the hot and archive tiers
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.appointment import Appointment, ArchivedAppointment
+from src.services.archive import archive_boundary
+from tests.conftest import appointment_doc
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_listing_without_date_from_reads_only_the_hot_collection(db, api):
+    await ArchivedAppointment.get_motor_collection().insert_one(
+        appointment_doc(scheduled_date=archive_boundary() - timedelta(days=1))
+    )
+    await Appointment.get_motor_collection().insert_one(appointment_doc())
+    db.reset()
+
+    response = await api.get("/api/schedule/")
+
+    assert len(response.json()) == 1
+    assert db.commands == ["find"]
+
+
+async def test_listing_from_before_the_boundary_includes_the_archive(db, api):
+    archived = archive_boundary() - timedelta(days=1)
+    await ArchivedAppointment.get_motor_collection().insert_one(appointment_doc(scheduled_date=archived))
+    await Appointment.get_motor_collection().insert_one(appointment_doc())
+
+    response = await api.get("/api/schedule/", params={
+        "date_from": archived.date().isoformat(),
+        "date_to": (archived + timedelta(days=2)).date().isoformat()
+    })
+
+    assert len(response.json()) == 2
+
+
+async def test_listing_up_to_a_date_before_the_boundary_includes_the_archive(db, api):
+    archived = archive_boundary() - timedelta(days=1)
+    await ArchivedAppointment.get_motor_collection().insert_one(appointment_doc(scheduled_date=archived))
+
+    response = await api.get("/api/schedule/", params={
+        "date_from": (archived - timedelta(days=2)).date().isoformat(),
+        "date_to": archived.date().isoformat()
+    })
+
+    assert len(response.json()) == 1
+
+
+async def test_open_ended_ranges_reaching_the_archive_are_rejected(db, api):
+    archived = (archive_boundary() - timedelta(days=1)).date().isoformat()
+
+    open_end = await api.get("/api/schedule/", params={"date_from": archived})
+    open_start = await api.get("/api/schedule/", params={"date_to": archived})
+
+    assert open_end.status_code == 400
+    assert open_start.status_code == 400
+
+
+async def test_hot_listing_pages_in_date_order(db, api):
+    days = [datetime(2030, 1, day) for day in (12, 10, 11)]
+    await Appointment.get_motor_collection().insert_many([appointment_doc(scheduled_date=day) for day in days])
+
+    first = await api.get("/api/schedule/", params={"limit": 2})
+    second = await api.get("/api/schedule/", params={"limit": 2, "skip": 2})
+
+    dates = [item["scheduled_date"][:10] for item in first.json() + second.json()]
+    assert dates == ["2030-01-10", "2030-01-11", "2030-01-12"]
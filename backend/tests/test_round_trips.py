@@ -0,0 +1,112 @@
+"""
+Single-document writes take one MongoDB round-trip
+"""
+import pytest
+from bson import ObjectId
+
+from src.models.appointment import Appointment
+from src.models.patient import Patient
+from tests.conftest import appointment_doc, patient_doc
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _insert(model, doc: dict) -> str:
+    result = await model.get_motor_collection().insert_one(doc)
+    return str(result.inserted_id)
+
+
+async def test_update_patient_is_one_round_trip(db, api):
+    patient_id = await _insert(Patient, patient_doc(version=0))
+    db.reset()
+
+    response = await api.put(f"/api/patients/{patient_id}", json={"tags": ["vip"]})
+
+    assert response.status_code == 200
+    assert response.json()["tags"] == ["vip"]
+    assert response.json()["version"] == 1
+    assert db.commands == ["findAndModify"]
+
+
+async def test_delete_patient_is_one_round_trip(db, api):
+    patient_id = await _insert(Patient, patient_doc(version=0))
+    db.reset()
+
+    response = await api.delete(f"/api/patients/{patient_id}")
+
+    assert response.status_code == 200
+    assert db.commands == ["findAndModify"]
+
+
+async def test_confirmation_attempt_is_one_round_trip(db, api):
+    patient_id = await _insert(Patient, patient_doc())
+
+    db.reset()
+    first = await api.post(f"/api/patients/{patient_id}/confirm", json={"method": "phone", "status": "confirmed"})
+    assert db.commands == ["findAndModify"]
+
+    db.reset()
+    second = await api.post(f"/api/patients/{patient_id}/confirm", json={"method": "sms", "status": "no_answer"})
+    assert db.commands == ["findAndModify"]
+
+    assert first.json()["confirmation_rate"] == 1.0
+    assert second.json()["confirmation_rate"] == 0.5
+    assert second.json()["version"] == 2
+    stored = await Patient.get_motor_collection().find_one({"_id": ObjectId(patient_id)})
+    assert [a["method"] for a in stored["confirmation_attempts"]] == ["phone", "sms"]
+
+
+async def test_confirmation_attempt_keeps_other_fields_and_bumps_version(db, api):
+    patient_id = await _insert(Patient, patient_doc(version=0))
+
+    await api.put(f"/api/patients/{patient_id}", json={"tags": ["vip"]})
+    await api.post(f"/api/patients/{patient_id}/confirm", json={"method": "phone", "status": "confirmed"})
+
+    response = await api.get(f"/api/patients/{patient_id}")
+    assert response.json()["tags"] == ["vip"]
+    assert response.json()["version"] == 2
+
+
+async def test_confirm_appointment_is_one_round_trip(db, api):
+    appointment_id = await _insert(Appointment, appointment_doc(version=0))
+    db.reset()
+
+    response = await api.post(f"/api/schedule/{appointment_id}/confirm", json={"method": "phone"})
+
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    assert db.commands == ["findAndModify"]
+
+
+async def test_update_appointment_status_is_one_round_trip(db, api):
+    appointment_id = await _insert(Appointment, appointment_doc(version=0))
+    db.reset()
+
+    response = await api.put(f"/api/schedule/{appointment_id}", json={"status": "completed"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert db.commands == ["findAndModify"]
+
+
+async def test_expected_version_zero_matches_unversioned_documents(db, api):
+    appointment_id = await _insert(Appointment, appointment_doc())
+    patient_id = await _insert(Patient, patient_doc())
+
+    appointment = await api.post(f"/api/schedule/{appointment_id}/confirm?expected_version=0", json={})
+    patient = await api.put(f"/api/patients/{patient_id}?expected_version=0", json={"tags": ["vip"]})
+
+    assert appointment.status_code == 200
+    assert patient.status_code == 200
+    assert patient.json()["version"] == 1
+
+
+async def test_stale_expected_version_conflicts(db, api):
+    appointment_id = await _insert(Appointment, appointment_doc(version=3))
+    db.reset()
+
+    response = await api.post(f"/api/schedule/{appointment_id}/confirm?expected_version=2", json={})
+
+    assert response.status_code == 409
+    # The conflict check is the only extra read
+    assert db.commands == ["findAndModify", "find"]
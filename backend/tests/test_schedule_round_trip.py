@@ -0,0 +1,79 @@
+"""
+Exporting a schedule and uploading it again leaves it as it was
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from src.models.appointment import Appointment
+from src.models.car import Car, Driver
+from src.models.patient import Patient
+from src.services.car_registry import car_registry
+from src.services.file_processor import appointment_row, parse_schedule_rows
+from tests.conftest import appointment_doc, patient_doc
+
+DAY = datetime(2030, 1, 10)
+CPF = "12345678901"
+
+
+@pytest.mark.asyncio
+async def test_export_then_upload_round_trips(db, api):
+    car = await Car(name="CARRO 1", driver=Driver(name="João", phone="21999887766")).insert()
+    car_registry.invalidate()
+    patient = await Patient.get_motor_collection().insert_one(patient_doc(CPF))
+
+    def doc(time_slot: str, **fields) -> dict:
+        return appointment_doc(
+            patient_id=str(patient.inserted_id), car_id=str(car.id), scheduled_date=DAY, time_slot=time_slot,
+            version=0, **fields
+        )
+
+    collection = Appointment.get_motor_collection()
+    booked = await collection.insert_one(doc("08:00", confirmation={"status": "confirmed", "method": "phone"}))
+    dropped = await collection.insert_one(doc(
+        "09:00", status="cancelled", import_key=f"R1|{DAY.replace(hour=9).isoformat()}|{CPF}", import_hash=None
+    ))
+    refused = await collection.insert_one(doc("10:00", confirmation={"status": "cancelled", "attempts": 1}))
+    imported = await collection.insert_one(doc(
+        "11:00", import_key=f"R2|{DAY.replace(hour=11).isoformat()}|{CPF}", import_hash="stale"
+    ))
+
+    export = await api.get("/api/schedule/export", params={"date_from": "2030-01-10", "date_to": "2030-01-10"})
+    assert export.status_code == 200
+    assert "R1" not in export.text  # cancelled appointments are not exported by default
+
+    upload = await api.post("/api/schedule/upload", files={"file": ("agenda.csv", export.content, "text/csv")})
+    assert upload.status_code == 200
+    assert upload.json()["inserted"] == 0
+    assert upload.json()["removed"] == 0
+
+    stored = {doc["_id"]: doc async for doc in collection.find()}
+    assert len(stored) == 4
+    assert stored[dropped.inserted_id]["status"] == "cancelled"
+    assert stored[booked.inserted_id]["confirmation"]["status"] == "confirmed"
+    assert stored[refused.inserted_id]["confirmation"]["status"] == "cancelled"
+    assert stored[imported.inserted_id]["status"] == "scheduled"
+
+
+def test_confirmation_labels_are_read_back():
+    appointment = appointment_doc(_id=ObjectId(), confirmation={"status": "no_show"})
+    row = dict(zip(
+        ["ID Sala", "Nome da Sala", "Data/Hora Início", "Data/Hora Fim", "Nome do Paciente"],
+        appointment_row(appointment, patient_doc(CPF), "CARRO 1")
+    ))
+    row["Status Confirmação"] = "Não Compareceu"
+    row["Documento(s) Paciente"] = f"CPF: {CPF}"
+
+    [record], errors = parse_schedule_rows([row])
+
+    assert errors == []
+    assert record["confirmation_status"] == "no_show"
+    assert record["appointment_id"] == str(appointment["_id"])
+
+
+def test_malformed_time_slot_exports_empty_times():
+    row = appointment_row(appointment_doc(_id=ObjectId(), time_slot="8h"), None, "CARRO 1")
+
+    assert row[2] == ""
+    assert row[3] == ""
@@ -0,0 +1,64 @@
+"""
+Time slot parsing and validation
+"""
+import pytest
+
+from src.models.appointment import Appointment, normalize_time_slot, parse_time_slot
+from src.models.car import Car
+from tests.conftest import appointment_doc
+
+
+@pytest.mark.parametrize("time_slot, minutes", [("08:00", 480), ("8:00", 480), ("23:59", 1439)])
+def test_parse_time_slot(time_slot, minutes):
+    assert parse_time_slot(time_slot) == minutes
+
+
+@pytest.mark.parametrize("time_slot", ["24:00", "08:60", "8h", "08:00:00", "", None])
+def test_parse_time_slot_rejects_malformed_values(time_slot):
+    with pytest.raises(ValueError):
+        parse_time_slot(time_slot)
+
+
+def test_normalize_time_slot():
+    assert normalize_time_slot("8:05") == "08:05"
+
+
+@pytest.mark.asyncio
+async def test_malformed_stored_time_slot_still_loads(db):
+    result = await Appointment.get_motor_collection().insert_one(appointment_doc(time_slot="8h"))
+
+    appointment = await Appointment.get(result.inserted_id)
+
+    assert appointment.start_at is None
+
+
+@pytest.mark.asyncio
+async def test_update_with_malformed_time_slot_is_rejected(db, api):
+    result = await Appointment.get_motor_collection().insert_one(appointment_doc())
+
+    response = await api.put(f"/api/schedule/{result.inserted_id}", json={"time_slot": "8h"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_reschedule_over_malformed_stored_time_slot_is_rejected(db, api):
+    result = await Appointment.get_motor_collection().insert_one(appointment_doc(time_slot="8h"))
+
+    response = await api.put(f"/api/schedule/{result.inserted_id}", json={"duration": 45})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_car_with_malformed_working_hours_still_loads(db):
+    result = await Car.get_motor_collection().insert_one({
+        "name": "CARRO 9",
+        "driver": {"name": "João", "phone": "21999887766"},
+        "working_hours": {"start_time": "7h", "end_time": "18:00"},
+    })
+
+    car = await Car.get(result.inserted_id)
+
+    assert car.working_hours.start_minute is None
+    assert car.working_hours.end_minute == 1080
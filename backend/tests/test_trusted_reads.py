@@ -0,0 +1,49 @@
+"""
+Trusted reads return the same JSON shape as the validated path
+"""
+import pytest
+
+from src.core.config import settings
+from src.models.appointment import Appointment
+from src.models.patient import Patient
+from tests.conftest import appointment_doc, patient_doc
+
+pytestmark = pytest.mark.asyncio
+
+
+def _shape(value):
+    """Nested keys of a JSON value"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shape(item) for item in value]
+    return None
+
+
+async def _both(api, monkeypatch, url: str):
+    monkeypatch.setattr(settings, "TRUSTED_READS", True)
+    trusted = (await api.get(url)).json()
+    monkeypatch.setattr(settings, "TRUSTED_READS", False)
+    validated = (await api.get(url)).json()
+    return trusted, validated
+
+
+async def test_legacy_appointments_get_defaults(db, api, monkeypatch):
+    # Written before version, start_at/end_at and the import fields existed
+    await Appointment.get_motor_collection().insert_one(appointment_doc())
+
+    trusted, validated = await _both(api, monkeypatch, "/api/schedule/")
+
+    assert _shape(trusted) == _shape(validated)
+    assert trusted[0]["version"] == 0
+    assert trusted[0]["start_at"] == validated[0]["start_at"]
+
+
+async def test_legacy_patients_get_nested_defaults(db, api, monkeypatch):
+    await Patient.get_motor_collection().insert_one(patient_doc())
+
+    trusted, validated = await _both(api, monkeypatch, "/api/patients/")
+
+    assert _shape(trusted) == _shape(validated)
+    assert trusted[0]["version"] == 0
+    assert "zone" in trusted[0]["address"]
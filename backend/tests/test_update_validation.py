@@ -0,0 +1,43 @@
+"""
+Validation of appointment update bodies
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from src.models.appointment import Appointment
+from tests.conftest import appointment_doc
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _insert() -> ObjectId:
+    result = await Appointment.get_motor_collection().insert_one(appointment_doc())
+    return result.inserted_id
+
+
+@pytest.mark.parametrize("body", [
+    {"scheduled_date": "tomorrow"},
+    {"scheduled_date": 20300110},
+    {"duration": "half an hour"},
+    {"duration": 500},
+    {"duration": None},
+])
+async def test_invalid_values_are_rejected(db, api, body):
+    appointment_id = await _insert()
+
+    response = await api.put(f"/api/schedule/{appointment_id}", json=body)
+
+    assert response.status_code == 400
+
+
+async def test_scheduled_date_is_stored_at_midnight(db, api):
+    appointment_id = await _insert()
+
+    response = await api.put(f"/api/schedule/{appointment_id}", json={"scheduled_date": "2030-01-11T14:30:00"})
+
+    assert response.status_code == 200
+    stored = await Appointment.get_motor_collection().find_one({"_id": appointment_id})
+    assert stored["scheduled_date"] == datetime(2030, 1, 11)
+    assert stored["start_at"] == datetime(2030, 1, 11, 8, 0)